@@ -0,0 +1,117 @@
+"""Timing, memory and baseline helpers shared by the benchmarks."""
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import types
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTEGRATION_DIR = os.path.join(REPO_DIR, "custom_components", "smou")
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+INTEGRATION_PACKAGE = "smou_integration"
+
+def load_integration(*names):
+    """
+    Import modules of the integration without its __init__, which needs Home
+    Assistant, by registering a bare package for their relative imports
+    Args:
+        names (str): Module names, e.g. "aggregation"
+    Returns:
+        list: The imported modules
+    """
+    if INTEGRATION_PACKAGE not in sys.modules:
+        package = types.ModuleType(INTEGRATION_PACKAGE)
+        package.__path__ = [INTEGRATION_DIR]
+        sys.modules[INTEGRATION_PACKAGE] = package
+
+    modules = []
+    for name in names:
+        full_name = f"{INTEGRATION_PACKAGE}.{name}"
+        if full_name not in sys.modules:
+            spec = importlib.util.spec_from_file_location(full_name, os.path.join(INTEGRATION_DIR, f"{name}.py"))
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[full_name] = module
+            spec.loader.exec_module(module)
+        modules.append(sys.modules[full_name])
+    return modules
+
+def load_scraper():
+    """Import smou.py, which has no side effects until main() runs."""
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    import smou
+    return smou
+
+def benchmark(func, items, repeat=5, setup=None):
+    """
+    Time a function and measure its peak memory
+    Args:
+        func (callable): Code to measure, called with the result of setup
+        items (int): Number of items one call processes, for the throughput
+        repeat (int): Number of timed calls
+        setup (callable | None): Untimed preparation before every call
+    Returns:
+        dict: Median seconds per call, items per second and peak KiB allocated
+    """
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - start)
+
+    # tracemalloc slows everything down, so memory gets its own call
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = statistics.median(timings)
+    return {
+        "seconds": seconds,
+        "items_per_second": items / seconds if seconds else None,
+        "peak_kib": peak / 1024,
+    }
+
+def report(name, results, save=False):
+    """
+    Print benchmark results next to the baseline, or save them as the new one
+    Args:
+        name (str): Baseline file name, without extension
+        results (dict): Benchmark name to the dict returned by benchmark()
+        save (bool): Replace the baseline with these results
+    """
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    baseline = {}
+    if not save and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+
+    width = max(map(len, results))
+    for key, result in results.items():
+        line = (f"{key:<{width}}  {result['seconds'] * 1000:10.2f} ms"
+                f"  {result['items_per_second'] or 0:14,.0f} items/s"
+                f"  {result['peak_kib']:10,.0f} KiB peak")
+        previous = baseline.get(key)
+        if previous and previous["seconds"]:
+            line += (f"  time {result['seconds'] / previous['seconds'] - 1:+.0%}"
+                     f"  memory {result['peak_kib'] / previous['peak_kib'] - 1 if previous['peak_kib'] else 0:+.0%}")
+        print(line)
+
+    if save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {path}")
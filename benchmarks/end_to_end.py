@@ -0,0 +1,103 @@
+"""
+Benchmark a full scraper run against the local mock portal
+
+Starts benchmarks/mock_portal.py, runs smou.py against it in a fresh process
+with headless Chrome, and reports the wall time, movements per second and
+peak memory of the run. Needs Chrome and the scraper's requirements, but no
+network or SMOU account. The per step timings printed by the scraper show
+where the time goes.
+
+    python benchmarks/end_to_end.py --accounts 2 --movements 200 --latency 0.2
+    python benchmarks/end_to_end.py --direct-pdf --workers 2 --save
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import REPO_DIR, report
+from generate_data import PLATES
+from mock_portal import start_portal
+
+def scraper_environment(portal_url, accounts, direct_pdf):
+    """
+    Build the scraper's environment for the mock portal. Variables right
+    after the last account and plate are set empty, so a local .env can't
+    add any more
+    """
+    env = dict(os.environ)
+    env["SMOU_MOVEMENTS_URL"] = f"{portal_url}/movements/"
+    env["SMOU_PDF_URL"] = f"{portal_url}/api/movements/{{id}}/pdf" if direct_pdf else ""
+    env["HOME_ASSISTANT_URL"] = ""
+    for index in range(1, accounts + 1):
+        env[f"ACCOUNT{index}_EMAIL"] = f"account{index}@example.com"
+        env[f"ACCOUNT{index}_PASSWORD"] = "password"
+    env[f"ACCOUNT{accounts + 1}_EMAIL"] = ""
+    for index, (plate, label) in enumerate(PLATES.items(), start=1):
+        env[f"LICENSE_PLATE_TARIFF_{index}"] = f"{plate};{label.lower()}"
+    env[f"LICENSE_PLATE_TARIFF_{len(PLATES) + 1}"] = ""
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper end to end against a mock portal")
+    parser.add_argument('--accounts', type=int, default=1, help="Number of accounts to scrape")
+    parser.add_argument('--movements', type=int, default=100, help="Number of movements of every account")
+    parser.add_argument('--page-size', type=int, default=10, help="Rows per table page")
+    parser.add_argument('--latency', type=float, default=0.1,
+                       help="Seconds the portal adds to every page and table response")
+    parser.add_argument('--pdf-latency', type=float, default=0.05,
+                       help="Seconds the portal adds to every receipt download")
+    parser.add_argument('--direct-pdf', action='store_true',
+                       help="Download receipts over HTTP (SMOU_PDF_URL) instead of through the browser")
+    parser.add_argument('--workers', type=int, default=1, help="Accounts scraped in parallel")
+    parser.add_argument('--save', action='store_true', help="Save the results as the new baseline")
+    args = parser.parse_args()
+
+    server = start_portal(0, args.movements, args.page_size, args.latency, args.pdf_latency)
+    portal_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "smou_parking_data.jsonl")
+            command = [
+                sys.executable, os.path.join(REPO_DIR, "smou.py"),
+                "--output", output,
+                "--download-dir", os.path.join(directory, "downloads"),
+                "--pdf-cache", os.path.join(directory, "pdf_cache.json"),
+                "--driver-manifest", os.path.join(directory, "chromedriver.json"),
+                "--workers", str(args.workers),
+            ]
+            start = time.perf_counter()
+            subprocess.run(command, env=scraper_environment(portal_url, args.accounts, args.direct_pdf), check=True)
+            seconds = time.perf_counter() - start
+
+            records = []
+            if os.path.exists(output):
+                with open(output, 'r', encoding='utf-8') as f:
+                    records = [json.loads(line) for line in f if line.strip()]
+    finally:
+        server.shutdown()
+
+    expected = args.accounts * args.movements
+    complete = len(records) == expected
+    if not complete:
+        print(f"Warning: scraped {len(records)} movements, the portal serves {expected}")
+    missing_receipts = sum(1 for record in records if record["pdf_error"])
+    if missing_receipts:
+        print(f"Warning: {missing_receipts} movements without a parsed receipt")
+
+    name = (f"scrape {args.accounts}x{args.movements} page {args.page_size}"
+            f" {'direct' if args.direct_pdf else 'browser'} receipts, {args.workers} worker(s)")
+    report("end_to_end", {name: {
+        "seconds": seconds,
+        "items_per_second": len(records) / seconds,
+        # Largest resident set of the scraper and its children, in KiB on Linux
+        "peak_kib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }}, args.save and complete)
+    return 0 if complete else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
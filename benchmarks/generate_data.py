@@ -0,0 +1,120 @@
+"""
+Generate synthetic SMOU parking histories for the benchmarks
+
+The records look like the ones written by smou.py: a mix of blue, green and
+other zones over several years and the January tariff boundary, several
+plates and accounts, receipts with and without a base tariff, and some
+movements whose receipt could not be downloaded.
+
+    python benchmarks/generate_data.py --count 50000 --output smou_parking_data.json
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+from common import load_scraper
+
+PLATES = {"1234ABC": "ECO", "5678DEF": "C", "9012GHI": "0"}
+ACCOUNTS = ("first@example.com", "second@example.com")
+# Zone name, share of the movements and base tariff in €/h
+ZONES = (("Zona Blava", 0.6, 3.25), ("Zona Verda", 0.35, 3.5), ("Zona DUM", 0.05, 0.0))
+# Share of the applied tariff per environmental label
+LABEL_DISCOUNTS = {"ECO": 0.75, "C": 1.0, "0": 0.0}
+FIRST_START = datetime(2023, 5, 1, 8, 0, 0)
+LAST_START = datetime(2025, 12, 31, 20, 0, 0)
+
+def euros(amount):
+    """Format an amount like the SMOU portal, e.g. 2,50 €."""
+    return f"{amount:.2f}".replace('.', ',') + " €"
+
+def generate_records(count, seed=0, first_id=10_000_000, accounts=ACCOUNTS, legacy=False):
+    """
+    Generate a chronological parking history
+    Args:
+        count (int): Number of movements
+        seed (int): Seed of the random generator, for reproducible files
+        first_id (int): Movement ID of the oldest record
+        accounts (tuple): Account emails the movements are spread over
+        legacy (bool): Leave out the derived fields, like older scraper versions
+    Returns:
+        list: Parking records in the scraper's format
+    """
+    smou = load_scraper()
+    rng = random.Random(seed)
+    zone_names = [zone for zone, _, _ in ZONES]
+    zone_weights = [weight for _, weight, _ in ZONES]
+    base_tariffs = {zone: tariff for zone, _, tariff in ZONES}
+    span = (LAST_START - FIRST_START).total_seconds()
+    starts = sorted(FIRST_START + timedelta(seconds=rng.uniform(0, span)) for _ in range(count))
+
+    records = []
+    for index, start in enumerate(starts):
+        zone = rng.choices(zone_names, zone_weights)[0]
+        plate = rng.choice(list(PLATES))
+        label = PLATES[plate]
+        minutes = rng.randint(5, 240)
+        end = start + timedelta(minutes=minutes)
+        base_tariff = base_tariffs[zone]
+        applied_tariff = base_tariff * LABEL_DISCOUNTS[label]
+        cost = applied_tariff * minutes / 60
+        pdf_error = "PDF not available" if rng.random() < 0.05 else ""
+        with_receipt = not pdf_error and rng.random() < 0.8
+
+        records.append({
+            "ID": str(first_id + index),
+            "Start date": start.strftime('%d/%m/%Y %H:%M:%S'),
+            "End date": end.strftime('%d/%m/%Y %H:%M:%S'),
+            "Number of hours and minutes": f"{minutes // 60}h {minutes % 60}m",
+            "Type of parking": zone,
+            "Cost": euros(cost) if cost else "-",
+            "Mail": rng.choice(accounts),
+            "base_tariff": f"{base_tariff:.2f}".replace('.', ',') if with_receipt else "",
+            "applied_tariff": f"{applied_tariff:.2f}".replace('.', ',') if with_receipt else "",
+            "license_plate": plate,
+            "environmental_label": label,
+            "pdf_error": pdf_error,
+        })
+        if not legacy:
+            smou.add_derived_fields(records[-1])
+    return records
+
+def receipt_text(record):
+    """Return the text pdfplumber extracts from the receipt of a record."""
+    return "\n".join((
+        "Àrea de Mobilitat - Comprovant d'estacionament",
+        f"Identificador {record['ID']}",
+        record['Type of parking'],
+        f"Vehicle {record['license_plate']}",
+        f"Inici {record['Start date']}",
+        f"Fi {record['End date']}",
+        f"Tarifa base {record['base_tariff'] or '3,25'}€/h",
+        f"Tarifa aplicada {record['applied_tariff'] or '3,25'}€/h",
+        f"Distintiu ambiental {record['environmental_label']} - 25%",
+        f"Import {record['Cost']}",
+    ))
+
+def write_records(path, records):
+    """Write records as a JSON array, or as JSON Lines for .jsonl and .ndjson files."""
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            json.dump(records, f, ensure_ascii=False, separators=(',', ':'))
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic SMOU parking history")
+    parser.add_argument('--count', type=int, default=10_000, help="Number of movements")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the random generator")
+    parser.add_argument('--legacy', action='store_true',
+                       help="Leave out the derived fields, like older scraper versions")
+    parser.add_argument('--output', default='smou_parking_data.json',
+                       help="File to write (.jsonl or .ndjson for JSON Lines)")
+    args = parser.parse_args()
+
+    write_records(args.output, generate_records(args.count, args.seed, legacy=args.legacy))
+    print(f"Wrote {args.count} movements to {args.output}")
+
+if __name__ == "__main__":
+    main()
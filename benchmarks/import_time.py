@@ -0,0 +1,105 @@
+"""
+Measure how long it takes to start the scraper, before it does any work
+
+Runs `python -X importtime -c "import smou"` several times in fresh
+processes, reports the median cumulative import time and the slowest
+modules, and checks that none of the heavy dependencies are loaded at
+startup. With --save the results become the new baseline; otherwise they
+are compared against it.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --save
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "import_time.json")
+# Only imported by the code paths that need them
+HEAVY_MODULES = ("selenium", "webdriver_manager", "requests", "pdfplumber", "dotenv", "pandas")
+
+def measure_once(module):
+    """
+    Import a module in a fresh interpreter with -X importtime
+    Returns:
+        tuple: Cumulative microseconds per top-level import and per direct
+        import of the module, and every module imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    )
+    top_level, children, pending, imported = {}, {}, {}, set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        imported.add(name.strip())
+        # A module's imports are listed right before the module itself
+        if depth == 1:
+            pending[name.strip()] = int(cumulative)
+        elif depth == 0:
+            top_level[name.strip()] = int(cumulative)
+            if name.strip() == module:
+                children = pending
+            pending = {}
+    return top_level, children, imported
+
+def measure(module, runs):
+    """
+    Import a module several times and summarize the runs
+    Returns:
+        dict: Median totals, the module's slowest imports and heavy modules loaded
+    """
+    samples = [measure_once(module) for _ in range(runs)]
+    names = set().union(*(children for _, children, _ in samples))
+    per_import = {name: statistics.median(children.get(name, 0) for _, children, _ in samples) for name in names}
+    imported = set().union(*(imported for _, _, imported in samples))
+    loaded = sorted(name for name in imported if name.split(".")[0] in HEAVY_MODULES)
+    return {
+        "total_us": statistics.median(sum(top_level.values()) for top_level, _, _ in samples),
+        "module_us": statistics.median(top_level[module] for top_level, _, _ in samples),
+        "slowest": dict(sorted(per_import.items(), key=lambda item: -item[1])[:10]),
+        "heavy_modules": loaded,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper's import time")
+    parser.add_argument('--module', default='smou', help="Module to import")
+    parser.add_argument('--runs', type=int, default=15, help="Number of fresh interpreters to measure")
+    parser.add_argument('--save', action='store_true', help="Save the results as the new baseline")
+    args = parser.parse_args()
+
+    results = measure(args.module, args.runs)
+    print(f"import {args.module}: {results['module_us'] / 1000:.1f} ms "
+          f"({results['total_us'] / 1000:.1f} ms including interpreter startup imports, median of {args.runs})")
+    for name, micros in results["slowest"].items():
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+    if results["heavy_modules"]:
+        print(f"Heavy modules loaded at startup: {', '.join(results['heavy_modules'])}")
+
+    if args.save:
+        results["python"] = platform.python_version()
+        results["platform"] = platform.platform()
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        change = results["module_us"] / baseline["module_us"] - 1 if baseline["module_us"] else 0
+        print(f"Baseline: {baseline['module_us'] / 1000:.1f} ms on Python {baseline['python']} ({change:+.0%})")
+
+    return 1 if results["heavy_modules"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
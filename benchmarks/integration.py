@@ -0,0 +1,131 @@
+"""
+Benchmark the Home Assistant integration against synthetic parking histories
+
+For every size, measures parsing the data file, aggregating the records, a
+refresh of the coordinator after a first load, after an append and without
+changes, for the JSON array, JSON Lines and SQLite formats, and the update of
+every sensor from the aggregates. Sensors are skipped when Home Assistant is
+not installed.
+
+    python benchmarks/integration.py
+    python benchmarks/integration.py --sizes 1000 50000 --save
+"""
+import argparse
+import json
+import os
+import tempfile
+import types
+
+from common import benchmark, load_integration, load_scraper, report
+from generate_data import generate_records, write_records
+
+# Share of the history the scraper appends between two refreshes
+APPEND_SHARE = 0.01
+
+def build_tariffs():
+    """Return the tariff schedule of a config entry with the default rates."""
+    (tariffs,) = load_integration("tariffs")
+    return tariffs.TariffSchedule.from_config(tariffs.default_config())
+
+def sensor_classes():
+    """Return every sensor class, or nothing when Home Assistant is not installed."""
+    try:
+        (sensor,) = load_integration("sensor")
+    except ImportError:
+        return []
+    return [
+        value for value in vars(sensor).values()
+        if isinstance(value, type) and issubclass(value, sensor.SMOUBaseSensor) and value is not sensor.SMOUBaseSensor
+    ]
+
+def benchmark_size(count, directory, repeat):
+    """
+    Run every integration benchmark on a history of one size
+    Returns:
+        dict: Benchmark name to results
+    """
+    aggregation, storage = load_integration("aggregation", "storage")
+    tariffs = build_tariffs()
+    records = generate_records(count)
+    appended = max(1, int(count * APPEND_SHARE))
+    results = {}
+
+    paths = {suffix: os.path.join(directory, f"smou_parking_data_{count}{suffix}") for suffix in (".json", ".jsonl", ".db")}
+    write_records(paths[".json"], records)
+    write_records(paths[".jsonl"], records)
+
+    smou = load_scraper()
+    connection = smou.open_sqlite_store(paths[".db"])
+    smou.sqlite_upsert(connection, records)
+    connection.close()
+
+    def read_json(_):
+        with open(paths[".json"], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    results[f"load json {count}"] = benchmark(read_json, count, repeat)
+
+    def read_jsonl(_):
+        with open(paths[".jsonl"], 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    results[f"load jsonl {count}"] = benchmark(read_jsonl, count, repeat)
+
+    results[f"aggregate {count}"] = benchmark(lambda _: aggregation.aggregate_records(records, tariffs), count, repeat)
+
+    for suffix in (".json", ".jsonl", ".db"):
+        path = paths[suffix]
+        name = suffix.lstrip(".").replace("db", "sqlite")
+
+        def fresh_source():
+            return storage.open_source(path), aggregation.IncrementalAggregator(tariffs)
+
+        def loaded_source():
+            source, aggregator = fresh_source()
+            source.load(aggregator)
+            return source, aggregator
+
+        def load(state):
+            source, aggregator = state
+            return source.load(aggregator)
+
+        results[f"refresh {name} first {count}"] = benchmark(load, count, repeat, fresh_source)
+        results[f"refresh {name} unchanged {count}"] = benchmark(load, count, repeat, loaded_source)
+
+        if suffix == ".db":
+            continue
+
+        def appended_source():
+            write_records(path, records[:-appended])
+            state = loaded_source()
+            write_records(path, records)
+            return state
+
+        results[f"refresh {name} append {appended} to {count}"] = benchmark(load, appended, repeat, appended_source)
+
+    data = aggregation.aggregate_records(records, tariffs)
+    for sensor_class in sensor_classes():
+        # update_from_data only sets attributes, no entity platform needed
+        results[f"sensor {sensor_class.__name__} {count}"] = benchmark(
+            lambda state: sensor_class.update_from_data(state, data), 1, repeat, types.SimpleNamespace
+        )
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SMOU integration")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 50_000],
+                       help="Number of movements of each synthetic history")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('--save', action='store_true', help="Save the results as the new baseline")
+    args = parser.parse_args()
+
+    if not sensor_classes():
+        print("Home Assistant is not installed, skipping the sensor benchmarks")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.sizes:
+            results.update(benchmark_size(count, directory, args.repeat))
+    report("integration", results, args.save)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+Local stand-in for the SMOU portal, to run and profile the scraper offline
+
+Reproduces the pages and elements smou.py drives: the login form, the
+mat-select-0 range picker with "Rang personalitzat", the mat-input-0 and
+mat-input-1 dates, the " Cercar " button, the paginated movements table at
+smou.TABLE_XPATH with its "N de M" label and next arrow, and the row actions
+menu with "Descarregar PDF". Every account that logs in gets its own
+synthetic history from generate_data.py, and receipts are generated PDFs.
+Receipts can also be fetched directly from /api/movements/{id}/pdf.
+
+    python benchmarks/mock_portal.py --port 8000 --movements 500 --latency 0.3
+
+Then run the scraper with SMOU_MOVEMENTS_URL=http://127.0.0.1:8000/movements/
+and LICENSE_PLATE_TARIFF_1=1234ABC;eco, LICENSE_PLATE_TARIFF_2=5678DEF;c and
+LICENSE_PLATE_TARIFF_3=9012GHI;zero, or use benchmarks/end_to_end.py.
+"""
+import argparse
+from datetime import datetime
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import secrets
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+import zlib
+
+from generate_data import generate_records, receipt_text
+
+LOGIN_HTML = """<!DOCTYPE html>
+<html lang="ca"><head><meta charset="utf-8"><title>SMOU - Iniciar sessió</title></head>
+<body><app-root><div>
+<form method="post" action="/login">
+<input type="email" name="email" placeholder=" Correu electrònic ">
+<input type="password" name="password" placeholder=" Contrasenya ">
+<button type="submit">Iniciar sessió</button>
+</form>
+</div></app-root></body></html>
+"""
+
+# The nesting of divs matches smou.TABLE_XPATH
+APP_HTML = """<!DOCTYPE html>
+<html lang="ca"><head><meta charset="utf-8"><title>SMOU - Moviments</title>
+<style>
+.hidden { display: none; }
+#overlay { position: absolute; top: 80px; left: 40px; background: #fff; border: 1px solid #999; }
+mat-select, mat-option { display: block; padding: 4px; cursor: pointer; }
+.fa-angle-right { display: inline-block; width: 16px; height: 16px; background: #333; cursor: pointer; }
+.actionText { padding: 4px; cursor: pointer; }
+</style></head>
+<body><app-root><div>
+<div><h1>SMOU</h1></div>
+<div><app-moviements><div><div>
+<div><h2>Moviments</h2></div>
+<div><form id="search">
+<mat-select id="mat-select-0" tabindex="0">Últims 30 dies</mat-select>
+<div id="range" class="hidden"><input id="mat-input-0" placeholder="Inici"><input id="mat-input-1" placeholder="Fi"></div>
+<button type="submit"><span> Cercar </span></button>
+</form></div>
+<div><div><div><div>
+<div><table>
+<thead><tr><th></th><th>ID</th><th>Inici</th><th>Fi</th><th>Matrícula</th><th>Adreça</th><th>Zona</th><th>Tipus</th><th>Distintiu</th><th>Durada</th><th>Import</th><th>Accions</th></tr></thead>
+<tbody id="rows"></tbody>
+</table></div>
+<div><span id="page-label"></span> <i class="fas fa-angle-right" id="next"></i></div>
+</div></div></div></div>
+</div></div></app-moviements></div>
+</div></app-root>
+<div id="overlay" class="hidden"></div>
+<script>
+const rows = document.getElementById('rows');
+const label = document.getElementById('page-label');
+const overlay = document.getElementById('overlay');
+let query = {from: '', to: ''};
+let page = 0;
+let pages = 0;
+let latestRequest = 0;
+
+function showOverlay(content) {
+  overlay.innerHTML = '';
+  overlay.appendChild(content);
+  overlay.classList.remove('hidden');
+}
+
+function hideOverlay() {
+  overlay.classList.add('hidden');
+  overlay.innerHTML = '';
+}
+
+function openActions(id) {
+  const item = document.createElement('div');
+  item.className = 'actionText';
+  item.textContent = 'Descarregar PDF';
+  item.addEventListener('click', () => {
+    const link = document.createElement('a');
+    link.href = '/api/movements/' + id + '/pdf?download=1';
+    link.download = '';
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    hideOverlay();
+  });
+  showOverlay(item);
+}
+
+async function load(newPage) {
+  // Only the latest search or page change may fill the table
+  const request = ++latestRequest;
+  const params = new URLSearchParams({from: query.from, to: query.to, page: newPage});
+  const response = await fetch('/api/movements?' + params, {credentials: 'same-origin'});
+  if (response.status === 401) {
+    location.reload();
+    return;
+  }
+  const data = await response.json();
+  if (request !== latestRequest) {
+    return;
+  }
+  page = data.page;
+  pages = data.pages;
+  rows.innerHTML = '';
+  for (const cells of data.rows) {
+    const row = document.createElement('tr');
+    cells.forEach((text, index) => {
+      const cell = document.createElement('td');
+      if (index === cells.length - 1) {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.textContent = text;
+        button.addEventListener('click', () => openActions(cells[1]));
+        cell.appendChild(button);
+      } else {
+        cell.textContent = text;
+      }
+      row.appendChild(cell);
+    });
+    rows.appendChild(row);
+  }
+  label.textContent = (pages ? page + 1 : 0) + ' de ' + pages;
+}
+
+document.getElementById('mat-select-0').addEventListener('click', () => {
+  const options = document.createElement('div');
+  for (const text of ['Últims 30 dies', 'Rang personalitzat']) {
+    const option = document.createElement('mat-option');
+    const span = document.createElement('span');
+    span.textContent = text;
+    option.appendChild(span);
+    option.addEventListener('click', () => {
+      document.getElementById('range').classList.toggle('hidden', text !== 'Rang personalitzat');
+      document.getElementById('mat-select-0').textContent = text;
+      hideOverlay();
+    });
+    options.appendChild(option);
+  }
+  showOverlay(options);
+});
+
+document.getElementById('search').addEventListener('submit', event => {
+  event.preventDefault();
+  query = {
+    from: document.getElementById('mat-input-0').value,
+    to: document.getElementById('mat-input-1').value,
+  };
+  load(0);
+});
+
+document.getElementById('next').addEventListener('click', () => {
+  if (page + 1 < pages) {
+    load(page + 1);
+  }
+});
+
+load(0);
+</script>
+</body></html>
+"""
+
+RECEIPT_PATH = re.compile(r"^/api/movements/(\d+)/pdf$")
+
+def receipt_pdf(text):
+    """
+    Build a one page PDF with one line of Helvetica per line of text, which
+    pdfplumber extracts back line by line
+    Args:
+        text (str): Receipt text, see generate_data.receipt_text
+    Returns:
+        bytes: PDF file
+    """
+    content = [b"BT", b"/F1 11 Tf", b"16 TL", b"50 780 Td"]
+    for line in text.split("\n"):
+        escaped = line.encode("cp1252").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+        content.append(b"(" + escaped + b") Tj T*")
+    content.append(b"ET")
+    stream = b"\n".join(content)
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        pdf += f"{offset:010d} 00000 n \n".encode()
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(pdf)
+
+def table_cells(record):
+    """Return the cells of the movements table row of a record."""
+    zone = record["Type of parking"]
+    return [
+        "",
+        record["ID"],
+        record["Start date"],
+        record["End date"],
+        record["license_plate"],
+        "C/ de Mallorca, 401",
+        zone.split()[-1],
+        zone,
+        record["environmental_label"],
+        record["Number of hours and minutes"],
+        record["Cost"],
+        "⋮",
+    ]
+
+class MockPortal:
+    """State of the mock portal: sessions and the history of every account."""
+
+    def __init__(self, movements, page_size, latency, pdf_latency):
+        self.movements = movements
+        self.page_size = page_size
+        self.latency = latency
+        self.pdf_latency = pdf_latency
+        self._sessions = {}
+        self._histories = {}
+        self._lock = threading.Lock()
+
+    def login(self, email):
+        """Start a session for an account and return its token."""
+        token = secrets.token_hex(16)
+        with self._lock:
+            self._sessions[token] = email
+            if email not in self._histories:
+                # Stable and distinct movement IDs for every account
+                seed = zlib.crc32(email.encode("utf-8"))
+                records = generate_records(self.movements, seed, 10_000_000 + seed % 1000 * 100_000, (email,))
+                # Listed newest first, like the real portal
+                self._histories[email] = (records[::-1], {record["ID"]: record for record in records})
+        return token
+
+    def history(self, token):
+        """Return the movements and movements by ID of a session, or None if it is not logged in."""
+        with self._lock:
+            email = self._sessions.get(token)
+            return self._histories.get(email) if email else None
+
+    def search(self, token, start, end, page):
+        """Return one page of the movements between two dd/mm/yyyy dates, both included."""
+        records, _ = self.history(token)
+        start = datetime.strptime(start, '%d/%m/%Y') if start else datetime.min
+        end = datetime.strptime(end, '%d/%m/%Y').replace(hour=23, minute=59, second=59) if end else datetime.max
+        found = [
+            record for record in records
+            if start <= datetime.strptime(record["Start date"], '%d/%m/%Y %H:%M:%S') <= end
+        ]
+        pages = -(-len(found) // self.page_size)
+        page = max(0, min(page, pages - 1))
+        return {
+            "page": page,
+            "pages": pages,
+            "rows": [table_cells(record) for record in found[page * self.page_size:(page + 1) * self.page_size]],
+        }
+
+def build_handler(portal):
+    """Return the request handler class serving a MockPortal."""
+
+    class PortalHandler(BaseHTTPRequestHandler):
+        def session(self):
+            cookie = SimpleCookie(self.headers.get("Cookie", ""))
+            token = cookie["session"].value if "session" in cookie else None
+            return token if token and portal.history(token) is not None else None
+
+        def send_body(self, status, content_type, body, extra_headers=()):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in extra_headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            token = self.session()
+
+            if url.path.startswith("/movements"):
+                time.sleep(portal.latency)
+                page = APP_HTML if token else LOGIN_HTML
+                self.send_body(200, "text/html; charset=utf-8", page.encode("utf-8"))
+                return
+
+            if token is None and url.path.startswith("/api/"):
+                self.send_body(401, "application/json", b'{"error": "unauthorized"}')
+                return
+
+            if url.path == "/api/movements":
+                time.sleep(portal.latency)
+                result = portal.search(
+                    token,
+                    query.get("from", [""])[0],
+                    query.get("to", [""])[0],
+                    int(query.get("page", ["0"])[0]),
+                )
+                self.send_body(200, "application/json", json.dumps(result, ensure_ascii=False).encode("utf-8"))
+                return
+
+            match = RECEIPT_PATH.match(url.path)
+            if match:
+                time.sleep(portal.pdf_latency)
+                _, by_id = portal.history(token)
+                record = by_id.get(match.group(1))
+                if record is None:
+                    self.send_body(404, "text/plain", b"Not found")
+                    return
+                headers = []
+                if "download" in query:
+                    headers.append(("Content-Disposition", f'attachment; filename="rebut_{record["ID"]}.pdf"'))
+                self.send_body(200, "application/pdf", receipt_pdf(receipt_text(record)), headers)
+                return
+
+            self.send_body(404, "text/plain", b"Not found")
+
+        def do_POST(self):
+            if urlsplit(self.path).path != "/login":
+                self.send_body(404, "text/plain", b"Not found")
+                return
+
+            time.sleep(portal.latency)
+            length = int(self.headers.get("Content-Length", 0))
+            form = parse_qs(self.rfile.read(length).decode("utf-8"))
+            email = form.get("email", [""])[0]
+            if not email or not form.get("password", [""])[0]:
+                self.send_body(200, "text/html; charset=utf-8", LOGIN_HTML.encode("utf-8"))
+                return
+
+            token = portal.login(email)
+            self.send_response(303)
+            self.send_header("Location", "/movements/")
+            self.send_header("Set-Cookie", f"session={token}; Path=/; HttpOnly")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *log_args):
+            pass
+
+    return PortalHandler
+
+def start_portal(port=0, movements=200, page_size=10, latency=0.0, pdf_latency=0.0):
+    """
+    Serve a mock portal from a background thread
+    Args:
+        port (int): Local port, 0 for any free one
+        movements (int): Number of movements of every account
+        page_size (int): Rows per table page
+        latency (float): Seconds added to every page and table response
+        pdf_latency (float): Seconds added to every receipt download
+    Returns:
+        ThreadingHTTPServer: The running server, stop it with shutdown()
+    """
+    portal = MockPortal(movements, page_size, latency, pdf_latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), build_handler(portal))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the SMOU portal")
+    parser.add_argument('--port', type=int, default=8000, help="Local port to listen on")
+    parser.add_argument('--movements', type=int, default=200, help="Number of movements of every account")
+    parser.add_argument('--page-size', type=int, default=10, help="Rows per table page")
+    parser.add_argument('--latency', type=float, default=0.0,
+                       help="Seconds added to every page and table response")
+    parser.add_argument('--pdf-latency', type=float, default=0.0,
+                       help="Seconds added to every receipt download")
+    args = parser.parse_args()
+
+    server = start_portal(args.port, args.movements, args.page_size, args.latency, args.pdf_latency)
+    print(f"Mock SMOU portal on http://127.0.0.1:{server.server_address[1]}/movements/")
+    print(f"Receipts on http://127.0.0.1:{server.server_address[1]}/api/movements/{{id}}/pdf")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
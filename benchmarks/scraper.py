@@ -0,0 +1,95 @@
+"""
+Benchmark the parts of smou.py that don't need a browser
+
+Measures the receipt and table parsers, and for every history size the
+deduplication and merge of a run's scraped movements, the incremental search
+start dates, the one-time backfill of the derived fields and the rewrite of
+the JSON array file.
+
+    python benchmarks/scraper.py
+    python benchmarks/scraper.py --sizes 1000 50000 --save
+"""
+import argparse
+import os
+import tempfile
+
+from common import benchmark, load_integration, load_scraper, report
+from generate_data import generate_records, receipt_text
+
+# Movements scraped per run: the new ones plus the overlap already stored
+NEW_SHARE = 0.01
+OVERLAP_SHARE = 0.02
+
+def benchmark_parsers(smou, repeat):
+    """
+    Time the parsers on a fixed sample of records
+    Returns:
+        dict: Benchmark name to results
+    """
+    (record_fields,) = load_integration("records")
+    records = generate_records(10_000)
+    texts = [receipt_text(record) for record in records]
+    costs = [record["Cost"] for record in records]
+    durations = [record["Number of hours and minutes"] for record in records]
+
+    return {
+        "parse_pdf_content": benchmark(lambda _: [smou.parse_pdf_content(text) for text in texts], len(texts), repeat),
+        "parse_cost": benchmark(lambda _: [record_fields.parse_cost(cost) for cost in costs], len(costs), repeat),
+        "parse_duration": benchmark(lambda _: [record_fields.parse_duration(duration) for duration in durations], len(durations), repeat),
+    }
+
+def benchmark_size(smou, count, directory, repeat):
+    """
+    Time merging a run's movements into a history of one size
+    Returns:
+        dict: Benchmark name to results
+    """
+    new = max(1, int(count * NEW_SHARE))
+    overlap = max(1, int(count * OVERLAP_SHARE))
+    records = generate_records(count + new)
+    stored, scraped = records[:count], records[count - overlap:]
+    # Accounts sharing a plate scrape the same movements twice
+    scraped = scraped + scraped[-new // 2:]
+    results = {}
+
+    def merge(existing_ids):
+        all_parsed_data = list(stored)
+        all_parsed_data.extend(smou.merge_new_entries(scraped, existing_ids))
+        return all_parsed_data
+    results[f"merge {len(scraped)} into {count}"] = benchmark(
+        merge, len(scraped), repeat, lambda: {entry["ID"] for entry in stored}
+    )
+    results[f"known ids {count}"] = benchmark(lambda _: {entry["ID"] for entry in stored}, count, repeat)
+    results[f"search start dates {count}"] = benchmark(
+        lambda _: smou.search_start_dates(smou.newest_movements(stored)), count, repeat
+    )
+
+    legacy = generate_records(count, legacy=True)
+    results[f"backfill derived fields {count}"] = benchmark(
+        smou.backfill_derived_fields, count, repeat, lambda: [dict(record) for record in legacy]
+    )
+
+    path = os.path.join(directory, f"smou_parking_data_{count}.json")
+    results[f"save json {count}"] = benchmark(lambda _: smou.save_parking_data(path, records), len(records), repeat)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SMOU scraper without a browser")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 50_000],
+                       help="Number of stored movements of each synthetic history")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument('--save', action='store_true', help="Save the results as the new baseline")
+    args = parser.parse_args()
+
+    smou = load_scraper()
+    # Default options, e.g. --overlap-days for the search start dates
+    smou.args = smou.build_arg_parser().parse_args([])
+
+    results = benchmark_parsers(smou, args.repeat)
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.sizes:
+            results.update(benchmark_size(smou, count, directory, args.repeat))
+    report("scraper", results, args.save)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,38 @@
 """The SMOU Parking integration."""
+import asyncio
+
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall
 
-from .const import DOMAIN
+from .const import DOMAIN, SERVICE_RELOAD
+from .coordinator import SMOUDataUpdateCoordinator
 
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up SMOU Parking from a config entry."""
+    coordinator = SMOUDataUpdateCoordinator(hass, entry)
+    await coordinator.async_config_entry_first_refresh()
+
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    if not hass.services.has_service(DOMAIN, SERVICE_RELOAD):
+        async def async_handle_reload(call: ServiceCall) -> None:
+            """Re-read the parking data of every entry, called by the scraper after saving."""
+            await asyncio.gather(*(
+                coordinator.async_refresh() for coordinator in hass.data.get(DOMAIN, {}).values()
+            ))
+
+        hass.services.async_register(DOMAIN, SERVICE_RELOAD, async_handle_reload)
     return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS) 
\ No newline at end of file
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        hass.data[DOMAIN].pop(entry.entry_id)
+        if not hass.data[DOMAIN]:
+            hass.services.async_remove(DOMAIN, SERVICE_RELOAD)
+    return unload_ok
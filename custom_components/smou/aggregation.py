@@ -0,0 +1,271 @@
+"""Single-pass aggregation of SMOU parking records."""
+from __future__ import annotations
+
+import copy
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from .const import PDF_NOT_AVAILABLE, SCHEMA_VERSION, SMOU_TIMEZONE, ZONES
+from .records import add_derived_fields
+from .tariffs import TariffSchedule
+
+
+@dataclass
+class GroupTotals:
+    """Entries, amount paid and hours parked for one group of records."""
+
+    entries: int = 0
+    paid: float = 0.0
+    hours: float = 0.0
+
+
+@dataclass(slots=True)
+class BucketTotals:
+    """Totals for one zone and plate during one day or month.
+
+    Never mutated, adding returns a new bucket, so snapshots can share them
+    instead of copying every bucket. Not frozen because frozen dataclasses
+    are several times slower to create.
+    """
+
+    entries: int = 0
+    paid: float = 0.0
+    hours: float = 0.0
+    regular: float = 0.0
+
+    def __add__(self, other: BucketTotals) -> BucketTotals:
+        """Return the sum of two buckets."""
+        return BucketTotals(
+            self.entries + other.entries,
+            self.paid + other.paid,
+            self.hours + other.hours,
+            self.regular + other.regular,
+        )
+
+
+@dataclass
+class ZoneTotals(GroupTotals):
+    """Totals for one parking zone."""
+
+    regular: float = 0.0
+    regular_hours: float = 0.0
+    entries_by_year: dict[int, int] = field(default_factory=dict)
+    paid_by_year: dict[int, float] = field(default_factory=dict)
+
+    @property
+    def regular_amount(self) -> float:
+        """Return the regular tariff amount, as reported by the sensors."""
+        return round(self.regular, 2) if self.regular_hours > 0 else 0.0
+
+
+@dataclass
+class ParkingAggregates:
+    """Every statistic exposed by the SMOU sensors."""
+
+    total_entries: int = 0
+    oldest: datetime | None = None
+    newest: datetime | None = None
+    zones: dict[str, ZoneTotals] = field(
+        default_factory=lambda: {zone: ZoneTotals() for zone in ZONES.values()}
+    )
+    pdf_error_entries: int = 0
+    pdf_error_entries_by_year: dict[int, int] = field(default_factory=dict)
+    by_plate: dict[str, GroupTotals] = field(default_factory=dict)
+    by_account: dict[str, GroupTotals] = field(default_factory=dict)
+    # Keyed by zone, plate and the first day of the bucket
+    daily: dict[tuple[str, str, date], BucketTotals] = field(default_factory=dict)
+    monthly: dict[tuple[str, str, date], BucketTotals] = field(default_factory=dict)
+
+    def add_record(self, entry: dict, tariffs: TariffSchedule) -> None:
+        """Fold a single parking record into the totals.
+
+        Uses the typed fields written by the scraper, records from older
+        scraper versions are only parsed until it backfills them.
+        """
+        if entry.get('schema_version') != SCHEMA_VERSION:
+            entry = add_derived_fields(dict(entry))
+
+        # Records whose start couldn't be parsed only count towards the totals
+        start_ts = entry['start_ts']
+        start_date = datetime.fromtimestamp(start_ts, SMOU_TIMEZONE) if start_ts is not None else None
+        pdf_errors = 1 if entry.get('pdf_error') == PDF_NOT_AVAILABLE else 0
+
+        zone_type = entry['zone']
+        if zone_type is None:
+            self.add_group(None, entry['start_year'], '', '', 1, pdf_errors, start_date, start_date)
+            return
+
+        cost = entry['cost_cents'] / 100 if entry['cost_cents'] is not None else 0.0
+        duration_hours = entry['duration_minutes'] / 60
+
+        # First try to use base_tariff from entry, otherwise the configured regular rate
+        rate = entry['base_tariff_per_hour']
+        if rate is None and start_ts is not None:
+            rate = tariffs.regular_rate(zone_type, start_ts)
+        if rate is not None:
+            regular, regular_hours = duration_hours * rate, duration_hours
+        else:
+            regular = regular_hours = 0.0
+
+        plate = entry.get('license_plate', '')
+        self.add_group(
+            zone_type, entry['start_year'], plate, entry.get('Mail', ''),
+            1, pdf_errors, start_date, start_date,
+            cost, duration_hours, regular, regular_hours,
+        )
+        if start_date is not None:
+            self.add_rollup(zone_type, plate, start_date.date(), 1, cost, duration_hours, regular)
+
+    def add_group(
+        self,
+        zone_type: str | None,
+        year: int | None,
+        plate: str,
+        account: str,
+        entries: int,
+        pdf_errors: int,
+        oldest: datetime | None,
+        newest: datetime | None,
+        paid: float = 0.0,
+        hours: float = 0.0,
+        regular: float = 0.0,
+        regular_hours: float = 0.0,
+    ) -> None:
+        """Fold pre-summed totals for records sharing zone, year, plate and account.
+
+        regular and regular_hours only cover the records that could be priced,
+        at their own base tariff or the regular rate in effect at their start.
+        Records without a start time have no year, oldest or newest.
+        """
+        self.total_entries += entries
+        if oldest is not None and (self.oldest is None or oldest < self.oldest):
+            self.oldest = oldest
+        if newest is not None and (self.newest is None or newest > self.newest):
+            self.newest = newest
+
+        if pdf_errors:
+            self.pdf_error_entries += pdf_errors
+            if year is not None:
+                self.pdf_error_entries_by_year[year] = self.pdf_error_entries_by_year.get(year, 0) + pdf_errors
+
+        if zone_type is None:
+            return
+
+        zone = self.zones[zone_type]
+        zone.entries += entries
+        zone.paid += paid
+        zone.hours += hours
+        if year is not None:
+            zone.entries_by_year[year] = zone.entries_by_year.get(year, 0) + entries
+            zone.paid_by_year[year] = zone.paid_by_year.get(year, 0.0) + paid
+
+        self.add_regular(zone_type, regular, regular_hours)
+
+        for groups, key in ((self.by_plate, plate), (self.by_account, account)):
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = GroupTotals()
+            group.entries += entries
+            group.paid += paid
+            group.hours += hours
+
+    def add_regular(self, zone_type: str, amount: float, hours: float) -> None:
+        """Fold hours priced at the regular tariff, separately from their group."""
+        zone = self.zones[zone_type]
+        zone.regular += amount
+        zone.regular_hours += hours
+
+    def add_rollup(
+        self,
+        zone_type: str,
+        plate: str,
+        day: date,
+        entries: int,
+        paid: float,
+        hours: float,
+        regular: float,
+    ) -> None:
+        """Fold pre-summed totals for records of one zone and plate into their day and month."""
+        totals = BucketTotals(entries, paid, hours, regular)
+        for buckets, key in (
+            (self.daily, (zone_type, plate, day)),
+            (self.monthly, (zone_type, plate, day.replace(day=1))),
+        ):
+            bucket = buckets.get(key)
+            buckets[key] = totals if bucket is None else bucket + totals
+
+    def zone_months(self, zone_type: str) -> dict[date, BucketTotals]:
+        """Return the monthly totals of a zone across plates, oldest first."""
+        months: dict[date, BucketTotals] = {}
+        for (zone, _, month), bucket in self.monthly.items():
+            if zone == zone_type:
+                months[month] = months[month] + bucket if month in months else bucket
+        return dict(sorted(months.items()))
+
+    def savings(self, zone_type: str) -> float:
+        """Return the savings for a zone, never below zero."""
+        zone = self.zones[zone_type]
+        savings = zone.regular_amount - round(zone.paid, 2)
+        return round(savings, 2) if savings > 0 else 0.0
+
+    @property
+    def total_savings(self) -> float:
+        """Return the savings across all zones."""
+        regular = sum(zone.regular_amount for zone in self.zones.values())
+        paid = sum(round(zone.paid, 2) for zone in self.zones.values())
+        return round(regular - paid, 2)
+
+
+def aggregate_records(records: list, tariffs: TariffSchedule) -> ParkingAggregates:
+    """Compute every statistic in a single pass over the records."""
+    aggregates = ParkingAggregates()
+    for entry in records:
+        aggregates.add_record(entry, tariffs)
+    return aggregates
+
+
+class IncrementalAggregator:
+    """Running totals that only fold in records appended since the last update."""
+
+    def __init__(self, tariffs: TariffSchedule) -> None:
+        """Initialize the aggregator."""
+        self.tariffs = tariffs
+        self._records: list = []
+        self._totals = ParkingAggregates()
+
+    def update(self, records: list) -> ParkingAggregates:
+        """Aggregate the full record list, processing only the new tail if possible.
+
+        The scraper only ever appends records, so when the previously seen
+        records are an unchanged prefix of the new list only the tail is folded
+        in. Any edited, removed or reordered record triggers a full rebuild.
+        """
+        known = len(self._records)
+        if len(records) >= known and records[:known] == self._records:
+            return self.extend(records[known:])
+        return self.rebuild(records)
+
+    def rebuild(self, records: list) -> ParkingAggregates:
+        """Discard the running totals and aggregate the records from scratch."""
+        self._records = []
+        self._totals = ParkingAggregates()
+        return self.extend(records)
+
+    def extend(self, records: list) -> ParkingAggregates:
+        """Fold records known to be appended after the ones already seen."""
+        try:
+            for entry in records:
+                self._totals.add_record(entry, self.tariffs)
+        except Exception:
+            # Partially folded totals can't be trusted, start over next time
+            self._records = []
+            self._totals = ParkingAggregates()
+            raise
+        self._records.extend(records)
+        return self.snapshot()
+
+    def snapshot(self) -> ParkingAggregates:
+        """Return a copy of the running totals that later updates won't mutate."""
+        # Rollup buckets are immutable, their dicts only need a shallow copy
+        memo = {id(buckets): dict(buckets) for buckets in (self._totals.daily, self._totals.monthly)}
+        return copy.deepcopy(self._totals, memo)
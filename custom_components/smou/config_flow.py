@@ -9,40 +9,12 @@ from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
 from .const import DOMAIN, DEFAULT_JSON_PATH
-
-YEARS = [2023, 2024, 2025]
-RATE_TYPES_BY_YEAR = {
-    2023: {
-        "blue_regular": 3.00,
-        "blue_eco": 2.25,
-        "blue_zero": 0.0,
-        "green_regular": 3.5,
-        "green_eco": 2.75,
-        "green_zero": 0.5
-    },
-    2024: {
-        "blue_regular": 3.00,
-        "blue_eco": 2.25,
-        "blue_zero": 0.0,
-        "green_regular": 3.5,
-        "green_eco": 2.75,
-        "green_zero": 0.5
-    },
-    2025: {
-        "blue_regular": 3.00,
-        "blue_eco": 2.25,
-        "blue_zero": 1.15,
-        "green_regular": 3.5,
-        "green_eco": 2.75,
-        "green_zero": 1.4
-    }
-}
+from .tariffs import default_config
 
 # Create schema for rates with support for both int and float
 rate_schema = {
-    vol.Required(f"{rate_type}_{year}", default=RATE_TYPES_BY_YEAR[year][rate_type]): vol.Coerce(float)
-    for year in YEARS
-    for rate_type in RATE_TYPES_BY_YEAR[year]
+    vol.Required(key, default=rate): vol.Coerce(float)
+    for key, rate in default_config().items()
 }
 
 STEP_USER_DATA_SCHEMA = vol.Schema({
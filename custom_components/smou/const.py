@@ -1,3 +1,13 @@
 """Constants for the SMOU Parking integration."""
+from datetime import timedelta
+
+# Shared with the scraper, which loads records.py on its own
+from .records import SCHEMA_VERSION, SMOU_TIMEZONE, ZONES  # noqa: F401
+
 DOMAIN = "smou_parking"
-DEFAULT_JSON_PATH = "/automations/smou_parking_data.json"
\ No newline at end of file
+DEFAULT_JSON_PATH = "/automations/smou_parking_data.json"
+# The scraper calls the reload service after every run, polling is only a fallback
+DEFAULT_SCAN_INTERVAL = timedelta(hours=1)
+SERVICE_RELOAD = "reload"
+
+PDF_NOT_AVAILABLE = "PDF not available"
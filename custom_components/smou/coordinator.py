@@ -0,0 +1,53 @@
+"""Data update coordinator for the SMOU Parking integration."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .aggregation import IncrementalAggregator, ParkingAggregates
+from .const import DOMAIN, DEFAULT_SCAN_INTERVAL
+from .statistics import async_import_statistics, first_changed_day
+from .storage import open_source
+from .tariffs import TariffSchedule
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SMOUDataUpdateCoordinator(DataUpdateCoordinator[ParkingAggregates]):
+    """Load and aggregate the parking data file once per refresh for all SMOU sensors."""
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN,
+            update_interval=DEFAULT_SCAN_INTERVAL,
+            always_update=False,
+        )
+        self.json_path = config_entry.data["json_path"]
+        self.tariffs = TariffSchedule.from_config(config_entry.data)
+        self._source = open_source(self.json_path)
+        self._aggregator = IncrementalAggregator(self.tariffs)
+
+    async def _async_update_data(self) -> ParkingAggregates:
+        """Read and aggregate the parking data file if it changed."""
+        try:
+            data = await self.hass.async_add_executor_job(self._source.load, self._aggregator)
+        except Exception as e:
+            raise UpdateFailed(f"Error reading JSON file: {str(e)}") from e
+
+        if data is None:
+            return self.data
+
+        # Only the days touched by new records are written to the recorder again
+        if self.data is None:
+            async_import_statistics(self.hass, data)
+        else:
+            since = first_changed_day(self.data.daily, data.daily)
+            if since is not None:
+                async_import_statistics(self.hass, data, since)
+        return data
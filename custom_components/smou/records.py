@@ -0,0 +1,97 @@
+"""Typed fields derived from the display strings of a SMOU parking record.
+
+The scraper stores them with every record, the integration derives them for
+records stored by older scrapers. Only uses the standard library, as smou.py
+loads this file on its own, without Home Assistant.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+# Version of the derived fields added by add_derived_fields
+SCHEMA_VERSION = 2
+# The SMOU portal shows local times in Barcelona
+SMOU_TIMEZONE = ZoneInfo("Europe/Madrid")
+
+# Parking zone names as shown on the SMOU website, mapped to rate keys
+ZONES = {
+    "Zona Blava": "blue",
+    "Zona Verda": "green",
+}
+
+
+def parse_cost(cost_str: str) -> float:
+    """Parse cost string to float, handling special cases."""
+    if not isinstance(cost_str, str):
+        raise ValueError(f"Not a cost: {cost_str!r}")
+    if cost_str.strip() == '-':
+        return 0.0
+    return float(cost_str.replace('€', '').replace(',', '.').strip())
+
+
+def parse_duration(duration_str: str) -> float:
+    """Parse duration string to hours."""
+    try:
+        time_parts = duration_str.split(' ')
+        hours = float(time_parts[0].replace('h', '').replace(',', '.'))
+        minutes = float(time_parts[1].replace('m', '')) if len(time_parts) > 1 else 0
+        return hours + (minutes / 60)
+    except (ValueError, IndexError):
+        return 0.0
+
+
+def parse_timestamp(date_str: str | None) -> int | None:
+    """Parse a dd/mm/yyyy hh:mm:ss local time to epoch seconds, or None if it isn't one."""
+    try:
+        return int(datetime.strptime(date_str.strip(), '%d/%m/%Y %H:%M:%S').replace(tzinfo=SMOU_TIMEZONE).timestamp())
+    except (AttributeError, ValueError):
+        return None
+
+
+def parse_rate(rate_str: str | None) -> float | None:
+    """Parse a "3,25" rate from a receipt to float, or None if there is none."""
+    try:
+        return float(rate_str.replace(',', '.')) if rate_str else None
+    except ValueError:
+        return None
+
+
+def add_derived_fields(record: dict) -> dict:
+    """Add typed fields next to the display strings of a record, in place.
+
+        start_ts, end_ts: epoch seconds
+        start_year, effective_year: calendar and tariff year
+        zone: "blue", "green" or None
+        cost_cents, duration_minutes: integers
+        base_tariff_per_hour: euros, or None when the receipt has none
+
+    A value that can't be parsed leaves its typed field None instead of
+    raising, so the record is still stored with its display strings.
+    Returns the same record.
+    """
+    start_ts = parse_timestamp(record.get("Start date", ""))
+    if start_ts is not None:
+        start_date = datetime.fromtimestamp(start_ts, SMOU_TIMEZONE)
+        start_year = start_date.year
+        # New tariffs come into effect on February 1st
+        effective_year = start_date.year - 1 if start_date.month == 1 else start_date.year
+    else:
+        start_year = effective_year = None
+    try:
+        cost_cents = round(parse_cost(record.get("Cost", "")) * 100)
+    except ValueError:
+        cost_cents = None
+
+    record.update({
+        "schema_version": SCHEMA_VERSION,
+        "start_ts": start_ts,
+        "end_ts": parse_timestamp(record.get("End date", "")),
+        "start_year": start_year,
+        "effective_year": effective_year,
+        "zone": ZONES.get(record.get("Type of parking")),
+        "cost_cents": cost_cents,
+        "duration_minutes": round(parse_duration(record.get("Number of hours and minutes", "")) * 60),
+        "base_tariff_per_hour": parse_rate(record.get("base_tariff")),
+    })
+    return record
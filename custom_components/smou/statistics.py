@@ -0,0 +1,73 @@
+"""Long-term statistics imported from the SMOU parking rollups."""
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import slugify
+
+from .aggregation import BucketTotals, ParkingAggregates
+from .const import DOMAIN, SMOU_TIMEZONE
+
+# BucketTotals field, statistic name and unit of every imported series
+METRICS = (
+    ("paid", "paid", "€"),
+    ("regular", "regular tariff", "€"),
+    ("hours", "hours", "h"),
+    ("entries", "entries", "entries"),
+)
+
+
+def first_changed_day(
+    previous: dict[tuple[str, str, date], BucketTotals],
+    current: dict[tuple[str, str, date], BucketTotals],
+) -> date | None:
+    """Return the oldest day whose daily buckets differ, or None if none do."""
+    changed = [key[2] for key, bucket in current.items() if previous.get(key) != bucket]
+    changed.extend(key[2] for key in previous.keys() - current.keys())
+    return min(changed, default=None)
+
+
+def daily_series(data: ParkingAggregates) -> dict[tuple[str, str], dict[date, BucketTotals]]:
+    """Sum the daily buckets per zone and per plate, keyed by statistic id prefix and name."""
+    series: dict[tuple[str, str], dict[date, BucketTotals]] = {}
+    for (zone_type, plate, day), bucket in data.daily.items():
+        plate_id = slugify(plate) or "unknown"
+        for key in ((zone_type, f"{zone_type.capitalize()} Zone"), (f"plate_{plate_id}", plate or "Unknown plate")):
+            days = series.setdefault(key, {})
+            days[day] = days[day] + bucket if day in days else bucket
+    return series
+
+
+@callback
+def async_import_statistics(hass: HomeAssistant, data: ParkingAggregates, since: date | None = None) -> None:
+    """Import the daily rollups as external statistics, from a day on or all of them.
+
+    The running sums are recomputed from the first day, but only the days from
+    since onwards are written, the recorder keeps the rest.
+    """
+    for (object_id, name), days in daily_series(data).items():
+        for metric, label, unit in METRICS:
+            metadata = StatisticMetaData(
+                has_mean=False,
+                has_sum=True,
+                name=f"SMOU {name} {label}",
+                source=DOMAIN,
+                statistic_id=f"{DOMAIN}:{object_id}_{metric}",
+                unit_of_measurement=unit,
+            )
+            total = 0.0
+            rows: list[StatisticData] = []
+            for day in sorted(days):
+                value = getattr(days[day], metric)
+                total += value
+                if since is None or day >= since:
+                    rows.append(StatisticData(
+                        start=datetime(day.year, day.month, day.day, tzinfo=SMOU_TIMEZONE),
+                        state=value,
+                        sum=total,
+                    ))
+            if rows:
+                async_add_external_statistics(hass, metadata, rows)
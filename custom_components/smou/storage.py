@@ -0,0 +1,189 @@
+"""Readers for the parking data files written by the SMOU scraper."""
+from __future__ import annotations
+
+from datetime import date, datetime
+import json
+import os
+from pathlib import Path
+import sqlite3
+
+from .aggregation import IncrementalAggregator, ParkingAggregates
+from .const import PDF_NOT_AVAILABLE, SMOU_TIMEZONE, ZONES
+from .tariffs import local_timestamp
+
+NDJSON_SUFFIXES = (".jsonl", ".ndjson")
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# One row per zone, year, plate and account with everything
+# ParkingAggregates.add_group needs, so Python only folds a handful of groups
+SQLITE_AGGREGATE_QUERY = """
+    SELECT zone, start_year, license_plate, mail,
+           COUNT(*),
+           TOTAL(pdf_error = ?),
+           MIN(start_time),
+           MAX(start_time),
+           TOTAL(cost),
+           TOTAL(duration_hours),
+           TOTAL(CASE WHEN base_tariff IS NOT NULL THEN duration_hours * base_tariff END),
+           TOTAL(CASE WHEN base_tariff IS NOT NULL THEN duration_hours END)
+    FROM movements
+    GROUP BY zone, start_year, license_plate, mail
+"""
+
+# One row per zone, plate and day for the rollups. The hours without their own
+# base tariff are priced per day with the tariff schedule, whose rates all
+# change at midnight
+SQLITE_ROLLUP_QUERY = """
+    SELECT zone, license_plate, DATE(start_time),
+           COUNT(*),
+           TOTAL(cost),
+           TOTAL(duration_hours),
+           TOTAL(duration_hours * base_tariff),
+           TOTAL(CASE WHEN base_tariff IS NULL THEN duration_hours END)
+    FROM movements
+    GROUP BY zone, license_plate, DATE(start_time)
+"""
+
+
+def zone_key(zone: str | None) -> str | None:
+    """Return the zone key of a row, also from databases the scraper hasn't upgraded yet."""
+    return zone if zone in ZONES.values() else ZONES.get(zone)
+
+
+def local_datetime(start_time: str | None) -> datetime | None:
+    """Return a stored local start time as an aware datetime, None if the record has none."""
+    if start_time is None:
+        return None
+    return datetime.fromisoformat(start_time).replace(tzinfo=SMOU_TIMEZONE)
+
+
+def open_source(path: str) -> ParkingDataSource:
+    """Return the reader matching the file format of path."""
+    if path.endswith(NDJSON_SUFFIXES):
+        return NdjsonSource(path)
+    if path.endswith(SQLITE_SUFFIXES):
+        return SqliteSource(path)
+    return JsonArraySource(path)
+
+
+class ParkingDataSource:
+    """Base reader that skips files which have not changed since the last load."""
+
+    def __init__(self, path: str) -> None:
+        """Initialize the reader."""
+        self.path = path
+        self._signature: tuple[int, int, int] | None = None
+
+    def load(self, aggregator: IncrementalAggregator) -> ParkingAggregates | None:
+        """Fold the file into the aggregator, or return None if it is unchanged.
+
+        Blocking, run it in the executor.
+        """
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if signature == self._signature:
+            return None
+
+        try:
+            data = self._read(stat, aggregator)
+        except Exception:
+            self.reset()
+            raise
+
+        self._signature = signature
+        return data
+
+    def reset(self) -> None:
+        """Forget what was read so the next load starts from scratch."""
+        self._signature = None
+
+    def _read(self, stat: os.stat_result, aggregator: IncrementalAggregator) -> ParkingAggregates:
+        """Read the file and fold its records into the aggregator."""
+        raise NotImplementedError
+
+
+class JsonArraySource(ParkingDataSource):
+    """Reader for the JSON array file, which has to be parsed as a whole."""
+
+    def _read(self, stat: os.stat_result, aggregator: IncrementalAggregator) -> ParkingAggregates:
+        """Parse the whole array and let the aggregator find the new tail."""
+        with open(self.path, 'r', encoding='utf-8') as file:
+            return aggregator.update(json.load(file))
+
+
+class NdjsonSource(ParkingDataSource):
+    """Reader for the append-only JSON Lines file, which only reads new lines."""
+
+    def __init__(self, path: str) -> None:
+        """Initialize the reader."""
+        super().__init__(path)
+        self._offset = 0
+        self._inode: int | None = None
+
+    def reset(self) -> None:
+        """Forget what was read so the next load starts from scratch."""
+        super().reset()
+        self._offset = 0
+        self._inode = None
+
+    def _read(self, stat: os.stat_result, aggregator: IncrementalAggregator) -> ParkingAggregates:
+        """Parse the lines appended since the last load."""
+        # A replaced or truncated file has to be read again from the start
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._offset = 0
+
+        with open(self.path, 'rb') as file:
+            file.seek(self._offset)
+            chunk = file.read()
+
+        # Leave a line the scraper is still writing for the next load
+        end = chunk.rfind(b'\n') + 1
+        records = [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+
+        if self._offset == 0:
+            data = aggregator.rebuild(records)
+        else:
+            data = aggregator.extend(records)
+
+        self._offset += end
+        self._inode = stat.st_ino
+        return data
+
+
+class SqliteSource(ParkingDataSource):
+    """Reader for the SQLite store, which aggregates with SQL GROUP BY."""
+
+    def _read(self, stat: os.stat_result, aggregator: IncrementalAggregator) -> ParkingAggregates:
+        """Fold the grouped totals computed by SQLite."""
+        data = ParkingAggregates()
+        uri = f"{Path(self.path).absolute().as_uri()}?mode=ro"
+        connection = sqlite3.connect(uri, uri=True)
+        try:
+            rows = connection.execute(SQLITE_AGGREGATE_QUERY, (PDF_NOT_AVAILABLE,)).fetchall()
+            rollups = connection.execute(SQLITE_ROLLUP_QUERY).fetchall()
+        finally:
+            connection.close()
+
+        for (zone, year, plate, account, entries, pdf_errors,
+             oldest, newest, paid, hours, base_amount, base_hours) in rows:
+            data.add_group(
+                zone_key(zone), year,
+                plate or '', account or '', entries, int(pdf_errors),
+                local_datetime(oldest),
+                local_datetime(newest),
+                paid, hours, base_amount, base_hours,
+            )
+
+        for zone, plate, day, entries, paid, hours, base_amount, unpriced_hours in rollups:
+            zone_type = zone_key(zone)
+            if zone_type is None or day is None:
+                continue
+            day = date.fromisoformat(day)
+            regular = base_amount
+            if unpriced_hours:
+                rate = aggregator.tariffs.regular_rate(zone_type, local_timestamp(day))
+                if rate is not None:
+                    data.add_regular(zone_type, unpriced_hours * rate, unpriced_hours)
+                    regular += unpriced_hours * rate
+            data.add_rollup(zone_type, plate or '', day, entries, paid, hours, regular)
+        return data
@@ -0,0 +1,92 @@
+"""Date-ranged SMOU tariffs compiled for bisect lookups."""
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import date, datetime
+import re
+
+from .const import SMOU_TIMEZONE
+
+# Hourly rates per zone and label, each in effect from its date until the next one
+DEFAULT_TARIFFS = {
+    date(2023, 2, 1): {
+        "blue": {"regular": 3.00, "eco": 2.25, "zero": 0.0},
+        "green": {"regular": 3.5, "eco": 2.75, "zero": 0.5},
+    },
+    date(2024, 2, 1): {
+        "blue": {"regular": 3.00, "eco": 2.25, "zero": 0.0},
+        "green": {"regular": 3.5, "eco": 2.75, "zero": 0.5},
+    },
+    date(2025, 2, 1): {
+        "blue": {"regular": 3.00, "eco": 2.25, "zero": 1.15},
+        "green": {"regular": 3.5, "eco": 2.75, "zero": 1.4},
+    },
+}
+
+# Config entry keys like "blue_regular_2025", the rate from February 1st of that year
+CONFIG_KEY = re.compile(r"^(?P<zone>[a-z]+)_(?P<label>regular|eco|zero)_(?P<year>\d{4})$")
+
+
+def config_key(zone: str, label: str, effective_from: date) -> str:
+    """Return the config entry key of one rate of the tariffs starting on a date."""
+    return f"{zone}_{label}_{effective_from.year}"
+
+
+def default_config() -> dict[str, float]:
+    """Return the default rates as config entry data."""
+    return {
+        config_key(zone, label, effective_from): rate
+        for effective_from, zones in DEFAULT_TARIFFS.items()
+        for zone, rates in zones.items()
+        for label, rate in rates.items()
+    }
+
+
+def local_timestamp(day: date) -> float:
+    """Return the epoch seconds of midnight in Barcelona at the start of a day."""
+    return datetime(day.year, day.month, day.day, tzinfo=SMOU_TIMEZONE).timestamp()
+
+
+class TariffSchedule:
+    """Hourly rates per zone and label, looked up by timestamp in O(log k).
+
+    Every rate applies from its effective date until the next rate of the same
+    zone and label, the newest one indefinitely, so new years keep working
+    with the last configured tariffs.
+    """
+
+    def __init__(self, rates: dict[tuple[str, str], dict[date, float]]) -> None:
+        """Compile {(zone, label): {effective_from: rate}} into sorted arrays."""
+        self._starts: dict[tuple[str, str], list[float]] = {}
+        self._rates: dict[tuple[str, str], list[float]] = {}
+        for key, periods in rates.items():
+            ordered = sorted(periods.items())
+            self._starts[key] = [local_timestamp(effective_from) for effective_from, _ in ordered]
+            self._rates[key] = [rate for _, rate in ordered]
+
+    @classmethod
+    def from_config(cls, data: dict) -> TariffSchedule:
+        """Build the schedule from every rate of the config entry, whatever its year."""
+        rates: dict[tuple[str, str], dict[date, float]] = {}
+        for key, value in data.items():
+            match = CONFIG_KEY.match(key)
+            if match is None:
+                continue
+            # New tariffs come into effect on February 1st
+            effective_from = date(int(match["year"]), 2, 1)
+            rates.setdefault((match["zone"], match["label"]), {})[effective_from] = float(value)
+        return cls(rates)
+
+    def rate(self, zone: str, label: str, timestamp: float) -> float | None:
+        """Return the rate in effect at a timestamp, or None before the first one."""
+        starts = self._starts.get((zone, label))
+        if not starts:
+            return None
+        index = bisect_right(starts, timestamp) - 1
+        if index < 0:
+            return None
+        return self._rates[(zone, label)][index]
+
+    def regular_rate(self, zone: str, timestamp: float) -> float | None:
+        """Return the regular rate of a zone in effect at a timestamp."""
+        return self.rate(zone, "regular", timestamp)
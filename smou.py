@@ -1,53 +1,87 @@
 import argparse
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from datetime import datetime
-from collections import defaultdict
+import importlib.util
+from datetime import datetime, timedelta
 import time
-import pandas as pd
 import os
-from dotenv import load_dotenv
-import requests
 import random
 import json
-import pdfplumber
 import tempfile
-from selenium.webdriver.common.action_chains import ActionChains
-import glob
+from contextlib import ExitStack, contextmanager
+import hashlib
+import io
+import sqlite3
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import signal
+import sys
+import shutil
+import subprocess
 
-# Load environment variables from .env file
-load_dotenv()
+# The record fields are defined once, in the integration, which Home Assistant
+# installs without this script. Load that file on its own, importing the
+# package would import Home Assistant
+_records_spec = importlib.util.spec_from_file_location(
+    "smou_records", os.path.join(os.path.dirname(os.path.abspath(__file__)), "custom_components", "smou", "records.py")
+)
+sys.modules["smou_records"] = importlib.util.module_from_spec(_records_spec)
+_records_spec.loader.exec_module(sys.modules["smou_records"])
+from smou_records import SCHEMA_VERSION, SMOU_TIMEZONE, add_derived_fields  # noqa: E402
 
-# Setup argument parser
-parser = argparse.ArgumentParser(description="Scrape SMOU parking data")
-parser.add_argument('--output', default='/app/smou_parking_data.json', 
-                   help="Path to output JSON file")
-args = parser.parse_args()
-
-###############################
-smou_moviments = os.getenv("SMOU_MOVEMENTS_URL")
+# Runtime configuration, filled in by main() from the command line and .env
+args = None
+smou_moviments = None
+pdf_url_template = None
 plate_tariffs = {}
-i = 1
-while True:
-    plate_tariff = os.getenv(f"LICENSE_PLATE_TARIFF_{i}")
-    if not plate_tariff:
-        break
-    try:
-        plate, tariff = plate_tariff.split(';')
-        plate_tariffs[plate] = tariff
-        i += 1
-    except ValueError:
-        print(f"Warning: Invalid format for LICENSE_PLATE_TARIFF_{i}. Expected format: PLATE;TARIFF")
-        i += 1
-        continue
+accounts = []
+home_assistant_url = None
+access_token = None
+home_assistant_verify = False
+headers = {}
+home_assistant_push = None
+
+def build_arg_parser():
+    """Return the command line parser of the scraper."""
+    parser = argparse.ArgumentParser(description="Scrape SMOU parking data")
+    parser.add_argument('--output', default='/app/smou_parking_data.json', 
+                       help="Path to output JSON file (.jsonl or .ndjson for append-only JSON Lines)")
+    parser.add_argument('--migrate-from', metavar='JSON_FILE',
+                       help="Convert an existing JSON array file into the JSON Lines file given by --output and exit")
+    parser.add_argument('--sqlite', metavar='DB_FILE',
+                       help="Also store parking data in an indexed SQLite database; --output is kept as a JSON export")
+    parser.add_argument('--workers', type=int, default=1,
+                       help="Number of accounts to scrape in parallel, each in its own browser session")
+    parser.add_argument('--pdf-connections', type=int, default=4,
+                       help="Maximum concurrent receipt downloads per account when SMOU_PDF_URL is set")
+    parser.add_argument('--pdf-cache', metavar='CACHE_FILE',
+                       help="Cache of parsed receipts keyed by content hash (default: pdf_cache.json next to --output)")
+    parser.add_argument('--pdf-processes', type=int, default=os.cpu_count(),
+                       help="Number of processes parsing receipts in parallel with the browser")
+    parser.add_argument('--incremental', action='store_true',
+                       help="Only search from each account's newest stored movement and stop at the first page without new entries")
+    parser.add_argument('--overlap-days', type=int, default=7,
+                       help="Days before the newest stored movement to search again in --incremental mode")
+    parser.add_argument('--download-dir', default=DOWNLOAD_DIR,
+                       help="Directory Chrome downloads receipts into, one subdirectory per account")
+    parser.add_argument('--profile-dir', metavar='DIR',
+                       help="Keep a persistent browser profile per account under DIR to reuse logins between runs")
+    parser.add_argument('--chromedriver', default=os.getenv("CHROMEDRIVER_PATH", "/usr/local/bin/chromedriver"),
+                       help="Local ChromeDriver to use when it matches the installed Chrome")
+    parser.add_argument('--driver-manifest', default=os.path.expanduser("~/.cache/smou/chromedriver.json"),
+                       help="Where to remember the resolved ChromeDriver between runs")
+    parser.add_argument('--daemon', action='store_true',
+                       help="Keep running and scrape on an internal schedule instead of once")
+    parser.add_argument('--interval', type=int, default=4 * 60 * 60,
+                       help="Seconds between the scheduled runs of each account in --daemon mode")
+    parser.add_argument('--jitter', type=int, default=10 * 60,
+                       help="Random seconds added to or removed from each account's interval in --daemon mode")
+    parser.add_argument('--trigger-port', type=int,
+                       help="HTTP port where POST /refresh starts an immediate run in --daemon mode")
+    parser.add_argument('--trigger-host', default="127.0.0.1",
+                       help="Address the --trigger-port server listens on, e.g. 0.0.0.0 inside a container")
+    parser.add_argument('--trigger-socket', metavar='PATH',
+                       help="Unix socket where any connection starts an immediate run in --daemon mode")
+    return parser
 
-if not plate_tariffs:
-    raise ValueError("No valid license plate tariffs found in environment variables. Please set LICENSE_PLATE_TARIFF_1, etc.")
 blue_zone_regular_cost=3.25
 blue_zone_eco_cost=2.50
 blue_zone_0_cost=0
@@ -85,53 +119,234 @@ user_agents = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 11.0; rv:91.0) Gecko/20100101 Firefox/91.0 Edg/92.0.902.62",
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 11_3_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36 Edg/91.0.864.59",
 ]
-#################################
-# Account credentials from environment variables
-accounts = []
-i = 1
-while True:
-    email = os.getenv(f"ACCOUNT{i}_EMAIL")
-    password = os.getenv(f"ACCOUNT{i}_PASSWORD")
-    if not email or not password:
-        break
-    accounts.append({"username": email, "password": password})
-    i += 1
-
-if not accounts:
-    raise ValueError("No valid accounts found in environment variables. Please ensure at least one account is configured (ACCOUNT1_EMAIL and ACCOUNT1_PASSWORD)")
-
-# Home Assistant details from environment variables
-home_assistant_url = os.getenv("HOME_ASSISTANT_URL")
-access_token = os.getenv("ACCESS_TOKEN")
-headers = {
-    "Authorization": f"Bearer {access_token}",
-    "content-type": "application/json",
+
+def load_config():
+    """
+    Read the portal URLs, license plate tariffs, accounts and Home Assistant
+    details from the environment and the .env file
+    """
+    global smou_moviments, pdf_url_template, plate_tariffs, accounts, home_assistant_url, access_token, home_assistant_verify, headers
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    smou_moviments = os.getenv("SMOU_MOVEMENTS_URL")
+    # Optional direct receipt download URL, e.g. https://.../movements/{id}/pdf
+    pdf_url_template = os.getenv("SMOU_PDF_URL")
+    plate_tariffs = {}
+    i = 1
+    while True:
+        plate_tariff = os.getenv(f"LICENSE_PLATE_TARIFF_{i}")
+        if not plate_tariff:
+            break
+        try:
+            plate, tariff = plate_tariff.split(';')
+            plate_tariffs[plate] = tariff
+            i += 1
+        except ValueError:
+            print(f"Warning: Invalid format for LICENSE_PLATE_TARIFF_{i}. Expected format: PLATE;TARIFF")
+            i += 1
+            continue
+
+    if not plate_tariffs:
+        raise ValueError("No valid license plate tariffs found in environment variables. Please set LICENSE_PLATE_TARIFF_1, etc.")
+
+    # Account credentials from environment variables
+    accounts = []
+    i = 1
+    while True:
+        email = os.getenv(f"ACCOUNT{i}_EMAIL")
+        password = os.getenv(f"ACCOUNT{i}_PASSWORD")
+        if not email or not password:
+            break
+        accounts.append({"username": email, "password": password})
+        i += 1
+
+    if not accounts:
+        raise ValueError("No valid accounts found in environment variables. Please ensure at least one account is configured (ACCOUNT1_EMAIL and ACCOUNT1_PASSWORD)")
+
+    # Home Assistant details from environment variables
+    home_assistant_url = os.getenv("HOME_ASSISTANT_URL")
+    access_token = os.getenv("ACCESS_TOKEN")
+    # "true", "false" (the default, for self-signed certificates) or a CA bundle path
+    verify = os.getenv("HOME_ASSISTANT_VERIFY_SSL", "false")
+    home_assistant_verify = {"true": True, "false": False}.get(verify.lower(), verify)
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "content-type": "application/json",
+    }
+
+DOWNLOAD_DIR = "/app/downloads"
+FULL_SCAN_START_DATE = "01/05/2023"
+
+# Text of every cell of every row of the table, as a list of lists
+READ_TABLE_SCRIPT = """
+return Array.from(arguments[0].querySelectorAll('tr'),
+    row => Array.from(row.querySelectorAll('td'), cell => cell.innerText));
+"""
+# Button in the last (Accions) cell of one row of the table
+ACTIONS_BUTTON_SCRIPT = """
+const cells = arguments[0].querySelectorAll('tr')[arguments[1]].querySelectorAll('td');
+return cells[cells.length - 1].querySelector('button');
+"""
+# Record any change to the table or the "N de M" page label from now on
+WATCH_RESULTS_SCRIPT = """
+window.smouResultsChanged = false;
+// An observer left by a wait that timed out would report the next change too early
+if (window.smouResultsObserver) {
+    window.smouResultsObserver.disconnect();
+}
+const observer = window.smouResultsObserver = new MutationObserver(() => {
+    window.smouResultsChanged = true;
+    observer.disconnect();
+});
+const targets = Array.from(arguments).filter(target => target);
+for (const target of targets.length ? targets : [document.querySelector('app-moviements') || document.body]) {
+    observer.observe(target, {childList: true, subtree: true, characterData: true});
 }
+"""
+TABLE_XPATH = "/html/body/app-root/div/div[2]/app-moviements/div/div/div[3]/div/div/div/div[1]/table"
+PAGE_LABEL_XPATH = "//span[contains(text(), 'de ')]"
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser")
+# Resolve the driver once per process, even with several workers starting at once
+driver_resolve_lock = threading.Lock()
+resolved_driver_path = None
+
+def build_chrome_options(download_dir, profile_dir=None):
+    """
+    Build the Chrome options for one browser session
+    Args:
+        download_dir (str): Directory the session downloads receipts into
+        profile_dir (str | None): Persistent user data directory, if any
+    """
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--headless=new")  # Comment out to see the browser window
+    options.add_argument("--ignore-certificate-errors")
+    options.add_argument("--allow-insecure-localhost")
+    options.add_argument("window-size=1920,1080")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument(f"user-agent={profile_user_agent(profile_dir) if profile_dir else random.choice(user_agents)}")
+    if profile_dir:
+        # Keeps the cookies and local storage of the last login between runs
+        options.add_argument(f"--user-data-dir={profile_dir}")
+    # Add these specific download preferences
+    options.add_experimental_option('prefs', {
+        'download.default_directory': download_dir,
+        'download.prompt_for_download': False,
+        'download.directory_upgrade': True,
+        'safebrowsing.enabled': False,
+        'download.default_directory_infobar_shown': False,
+        'plugins.always_open_pdf_externally': True,
+        'profile.default_content_settings.popups': 0,
+        'profile.default_content_setting_values.automatic_downloads': 1
+    })
+    # Add this to prevent the "multiple files" warning
+    options.add_experimental_option('excludeSwitches', ['enable-automation', 'safebrowsing-disable-download-protection'])
+    return options
+
+
+# Concurrent state updates, and pooled connections, to Home Assistant
+HA_PUSH_CONNECTIONS = 4
+# Service of the integration that re-reads the parking data
+HA_RELOAD_SERVICE = "smou_parking/reload"
 
-# Set up Chrome options
-options = Options()
-options.add_argument("--headless=new")  # Comment out to see the browser window
-options.add_argument("--ignore-certificate-errors")
-options.add_argument("--allow-insecure-localhost")
-options.add_argument("window-size=1920,1080")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--disable-gpu")
-options.add_argument(f"user-agent={random.choice(user_agents)}")
-# Add these specific download preferences
-options.add_experimental_option('prefs', {
-    'download.default_directory': '/app/downloads',
-    'download.prompt_for_download': False,
-    'download.directory_upgrade': True,
-    'safebrowsing.enabled': False,
-    'download.default_directory_infobar_shown': False,
-    'plugins.always_open_pdf_externally': True,
-    'profile.default_content_settings.popups': 0,
-    'profile.default_content_setting_values.automatic_downloads': 1
-})
-# Add this to prevent the "multiple files" warning
-options.add_experimental_option('excludeSwitches', ['enable-automation', 'safebrowsing-disable-download-protection'])
+class HomeAssistantPush:
+    """
+    Push sensor states to Home Assistant and call its services over one
+    keep-alive session, with retries, skipping the states that haven't
+    changed since the last push
+    """
+
+    def __init__(self, base_url, request_headers, verify=False, connections=HA_PUSH_CONNECTIONS):
+        import requests
+        from urllib3.util.retry import Retry
+
+        self.base_url = base_url
+        self.verify = verify
+        self.connections = connections
+        self._pushed = {}
+        # Connection errors and 429/5xx answers are retried after 0.5, 1 and 2 seconds
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=None)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=connections, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(request_headers)
+
+    def _post(self, entity_id, data):
+        """Send one state, returning whether Home Assistant accepted it."""
+        import requests
+
+        try:
+            response = self.session.post(f"{self.base_url}{entity_id}", json=data, verify=self.verify, timeout=(5, 10))
+        except requests.RequestException as e:
+            print(f"Failed to update {entity_id} in Home Assistant: {e}")
+            return False
+
+        # 201 when the entity is created, 200 when it is updated
+        if response.status_code in (200, 201):
+            print(f"Successfully updated {entity_id} in Home Assistant")
+            return True
+        print(f"Failed to update {entity_id} in Home Assistant: {response.content}")
+        return False
 
+    def push(self, sensor_data):
+        """
+        Send the changed states concurrently
+        Args:
+            sensor_data (dict): Dictionary of sensor_id: value pairs to update
+        """
+        changed = {}
+        for entity_id, state in sensor_data.items():
+            data = {
+                "state": state,
+                "attributes": {"unit_of_measurement": "€"}
+            }
+            if self._pushed.get(entity_id) != data:
+                changed[entity_id] = data
+
+        if not changed:
+            print("Home Assistant sensors are up to date")
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.connections, len(changed))) as executor:
+            results = executor.map(lambda item: self._post(*item), changed.items())
+            for (entity_id, data), accepted in zip(changed.items(), results):
+                if accepted:
+                    self._pushed[entity_id] = data
+
+    def call_service(self, service):
+        """Call a service without data, returning whether Home Assistant accepted it."""
+        import requests
+
+        # base_url points to the states API, the services live next to it
+        url = f"{self.base_url.split('/api/')[0].rstrip('/')}/api/services/{service}"
+        try:
+            response = self.session.post(url, json={}, verify=self.verify, timeout=(5, 10))
+        except requests.RequestException as e:
+            print(f"Failed to call {service} in Home Assistant: {e}")
+            return False
+
+        if response.status_code == 200:
+            return True
+        print(f"Failed to call {service} in Home Assistant: {response.status_code} {response.content}")
+        return False
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+def home_assistant():
+    """Return the process-wide Home Assistant session, so the daemon keeps its connections."""
+    global home_assistant_push
+    if home_assistant_push is None:
+        home_assistant_push = HomeAssistantPush(home_assistant_url, headers, home_assistant_verify)
+    return home_assistant_push
 
 def update_home_assistant_sensors(sensor_data):
     """
@@ -139,239 +354,1058 @@ def update_home_assistant_sensors(sensor_data):
     Args:
         sensor_data (dict): Dictionary of sensor_id: value pairs to update
     """
-    for entity_id, state in sensor_data.items():
-        data = {
-            "state": state,
-            "attributes": {"unit_of_measurement": "€"}
-        }
-        response = requests.post(
-            f"{home_assistant_url}{entity_id}",
-            headers=headers,
-            json=data,
-            verify=False
-        )
+    # One session for the whole process, so the daemon also skips unchanged states
+    home_assistant().push(sensor_data)
 
-        if response.status_code == 200:
-            print(f"Successfully updated {entity_id} in Home Assistant")
-        else:
-            print(f"Failed to update {entity_id} in Home Assistant: {response.content}")
+def notify_home_assistant():
+    """
+    Ask the integration to re-read the parking data now instead of at its next
+    poll. Does nothing without HOME_ASSISTANT_URL
+    """
+    if not home_assistant_url:
+        return
+    if home_assistant().call_service(HA_RELOAD_SERVICE):
+        print("Home Assistant is reloading the parking data")
+
+NDJSON_SUFFIXES = ('.jsonl', '.ndjson')
+
+def is_ndjson(path):
+    """Return whether path uses the append-only JSON Lines format."""
+    return path.endswith(NDJSON_SUFFIXES)
 
-def collect_parking_data():
+def load_parking_data(path):
+    """
+    Load the stored parking records
+    Args:
+        path (str): JSON array or JSON Lines file
+    """
+    if not is_ndjson(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    with open(path, 'rb+') as f:
+        content = f.read()
+        # Drop a record torn by an interrupted append so new lines start clean
+        end = content.rfind(b'\n') + 1
+        if end < len(content):
+            print(f"Discarding incomplete last line of {path}")
+            f.truncate(end)
+    return [json.loads(line) for line in content[:end].splitlines() if line.strip()]
+
+def append_parking_data(path, records):
+    """
+    Append records to a JSON Lines file, one per line, and fsync it
+    Args:
+        path (str): JSON Lines file
+        records (list): New parking records
+    """
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+@contextmanager
+def atomic_write(path):
+    """
+    Write a file through a temporary file in the same directory, so readers
+    only ever see the old or the complete new content
+    Args:
+        path (str): File to replace
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
     try:
-        # Try to load existing data first
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file as 0600, keep it readable by Home Assistant
         try:
-            with open(args.output, 'r', encoding='utf-8') as f:
-                all_parsed_data = json.load(f)
-                existing_ids = {entry["ID"] for entry in all_parsed_data}
-                print(f"Loaded {len(all_parsed_data)} existing entries")
+            os.chmod(temp_path, os.stat(path).st_mode & 0o777)
         except FileNotFoundError:
-            all_parsed_data = []
-            existing_ids = set()
-            print("No existing data found, starting fresh collection")
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
 
-        # Loop through each account
-        for account in accounts:
-            print(f"\nProcessing account: {account['username']}")
-            
-            driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-            driver.set_window_size(1920, 1080)
-            driver.command_executor._commands["send_command"] = ("POST", '/session/$sessionId/chromium/send_command')
-            driver.execute("send_command", {
-                'cmd': 'Page.setDownloadBehavior',
-                'params': {
-                    'behavior': 'allow',
-                    'downloadPath': '/app/downloads'
-                }
-            })
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def save_parking_data(path, records):
+    """
+    Atomically replace the JSON array file with all records
+    Args:
+        path (str): JSON array file
+        records (list): All parking records
+    """
+    with atomic_write(path) as f:
+        json.dump(records, f, ensure_ascii=False, separators=(',', ':'))
+
+def rewrite_ndjson(path, records):
+    """
+    Atomically replace a JSON Lines file with all records
+    Args:
+        path (str): JSON Lines file
+        records (list): All parking records
+    """
+    with atomic_write(path) as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def migrate_to_ndjson(source, destination):
+    """
+    Convert a JSON array file into a JSON Lines file
+    Args:
+        source (str): Existing JSON array file
+        destination (str): JSON Lines file to create
+    """
+    with open(source, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    backfill_derived_fields(records)
+    rewrite_ndjson(destination, records)
+    print(f"Migrated {len(records)} entries from {source} to {destination}")
+
+SQLITE_TABLE = """
+CREATE TABLE IF NOT EXISTS movements (
+    id TEXT PRIMARY KEY,
+    -- Local time, as yyyy-mm-dd hh:mm:ss. NULL, like the years, if the
+    -- record's start date couldn't be parsed
+    start_time TEXT,
+    start_year INTEGER,
+    effective_year INTEGER,
+    -- "blue", "green" or NULL, like the record's zone field
+    zone TEXT,
+    license_plate TEXT,
+    mail TEXT,
+    cost REAL,
+    duration_hours REAL,
+    base_tariff REAL,
+    pdf_error TEXT,
+    record TEXT NOT NULL
+);
+"""
+
+SQLITE_SCHEMA = SQLITE_TABLE + """
+CREATE INDEX IF NOT EXISTS idx_movements_start_time ON movements (start_time);
+CREATE INDEX IF NOT EXISTS idx_movements_zone ON movements (zone);
+CREATE INDEX IF NOT EXISTS idx_movements_license_plate ON movements (license_plate);
+CREATE INDEX IF NOT EXISTS idx_movements_mail ON movements (mail);
+-- Covers the integration's daily rollups by zone and plate
+CREATE INDEX IF NOT EXISTS idx_movements_rollup
+    ON movements (zone, license_plate, start_time, cost, duration_hours, base_tariff);
+"""
+
+SQLITE_UPSERT = """
+INSERT INTO movements (id, start_time, start_year, effective_year, zone, license_plate,
+                       mail, cost, duration_hours, base_tariff, pdf_error, record)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    start_time = excluded.start_time,
+    start_year = excluded.start_year,
+    effective_year = excluded.effective_year,
+    zone = excluded.zone,
+    license_plate = excluded.license_plate,
+    mail = excluded.mail,
+    cost = excluded.cost,
+    duration_hours = excluded.duration_hours,
+    base_tariff = excluded.base_tariff,
+    pdf_error = excluded.pdf_error,
+    record = excluded.record
+"""
+
+SQLITE_INSERT_NEW = """
+INSERT INTO movements (id, start_time, start_year, effective_year, zone, license_plate,
+                       mail, cost, duration_hours, base_tariff, pdf_error, record)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO NOTHING
+"""
+
+def backfill_derived_fields(records):
+    """
+    Add the derived fields to records stored by older versions
+    Args:
+        records (list): Stored parking records, updated in place
+    Returns:
+        list: The records that were updated
+    """
+    return [add_derived_fields(record) for record in records if record.get("schema_version") != SCHEMA_VERSION]
+
+def open_sqlite_store(path):
+    """Open the SQLite store, creating the table and indexes if needed."""
+    connection = sqlite3.connect(path)
+    connection.executescript(SQLITE_SCHEMA)
+    not_null = {name: notnull for _, name, _, notnull, *_ in connection.execute("PRAGMA table_info(movements)")}
+    if not_null["start_time"]:
+        # Older stores required a start time, SQLite can only drop that by copying the table
+        connection.executescript(f"""
+            BEGIN;
+            ALTER TABLE movements RENAME TO movements_old;
+            {SQLITE_TABLE};
+            INSERT INTO movements SELECT * FROM movements_old ORDER BY rowid;
+            DROP TABLE movements_old;
+            COMMIT;
+        """)
+        connection.executescript(SQLITE_SCHEMA)
+    return connection
+
+def sqlite_row(record):
+    """Build the movements row for a parking record."""
+    if record.get("schema_version") != SCHEMA_VERSION:
+        record = add_derived_fields(dict(record))
+    start_time = None
+    if record["start_ts"] is not None:
+        start_time = datetime.fromtimestamp(record["start_ts"], SMOU_TIMEZONE).replace(tzinfo=None).isoformat(sep=' ')
+    return (
+        record["ID"],
+        start_time,
+        record["start_year"],
+        record["effective_year"],
+        record["zone"],
+        record.get("license_plate"),
+        record.get("Mail"),
+        record["cost_cents"] / 100 if record["cost_cents"] is not None else None,
+        record["duration_minutes"] / 60,
+        record["base_tariff_per_hour"],
+        record.get("pdf_error"),
+        json.dumps(record, ensure_ascii=False),
+    )
+
+def sqlite_upsert(connection, records):
+    """Insert or update records in a single transaction."""
+    with connection:
+        connection.executemany(SQLITE_UPSERT, [sqlite_row(record) for record in records])
+
+def sqlite_load(connection):
+    """Load every stored record in insertion order."""
+    return [json.loads(record) for (record,) in connection.execute("SELECT record FROM movements ORDER BY rowid")]
+
+def sqlite_insert_new(connection, records):
+    """
+    Insert the records that aren't stored yet, once each, in a single transaction
+    Returns:
+        list: The inserted records, in scraping order
+    """
+    new_entries = []
+    with connection:
+        for record in records:
+            # The primary key does the deduplication, no need to know every stored ID
+            if connection.execute(SQLITE_INSERT_NEW, sqlite_row(record)).rowcount:
+                new_entries.append(record)
+    return new_entries
+
+def sqlite_newest_movements(connection):
+    """Return the start of each account's newest stored movement, as local time."""
+    return {
+        mail: datetime.fromisoformat(start_time)
+        for mail, start_time in connection.execute(
+            "SELECT mail, MAX(start_time) FROM movements WHERE start_time IS NOT NULL GROUP BY mail"
+        )
+    }
+
+def prepare_sqlite_store(connection, export_path):
+    """
+    Bring a database up to date with the derived fields: import the JSON export
+    into a new one, or rewrite the rows stored by an older version. The
+    database's user_version is the SCHEMA_VERSION of its rows
+    Args:
+        connection (sqlite3.Connection): The open store
+        export_path (str): JSON or JSON Lines file the records are exported to
+    Returns:
+        bool: Whether stored rows changed, so the export has to be rewritten
+    """
+    (version,) = connection.execute("PRAGMA user_version").fetchone()
+    if version == SCHEMA_VERSION:
+        return False
+
+    records = sqlite_load(connection)
+    if not records:
+        try:
+            records = load_parking_data(export_path)
+            print(f"Importing {len(records)} entries into {args.sqlite}")
+        except FileNotFoundError:
+            records = []
+    else:
+        print(f"Adding derived fields to {len(records)} entries in {args.sqlite}")
+    backfill_derived_fields(records)
+    sqlite_upsert(connection, records)
+    with connection:
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return bool(records)
+
+class SqliteIdLookup:
+    """Stored IDs looked up by primary key, safe to share between scraping threads."""
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def __contains__(self, entry_id):
+        with self._lock:
+            row = self._connection.execute("SELECT 1 FROM movements WHERE id = ?", (entry_id,)).fetchone()
+        return row is not None
 
+    def close(self):
+        """Close the lookup connection."""
+        self._connection.close()
+
+class StepTimer:
+    """Accumulate the wall-clock time spent in each scraping step."""
+
+    def __init__(self, label):
+        self.label = label
+        self.totals = {}
+        self.counts = {}
+
+    @contextmanager
+    def step(self, name):
+        """Time one occurrence of a step."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def report(self):
+        """Print the time spent per step."""
+        for name, total in self.totals.items():
+            count = self.counts[name]
+            print(f"Timing for {self.label}: {name} took {total:.2f}s over {count} call(s), {total / count:.2f}s each")
+
+def watch_results(driver):
+    """Start recording changes to the table and its page label, before a search or page change."""
+    from selenium.webdriver.common.by import By
+
+    tables = driver.find_elements(By.XPATH, TABLE_XPATH)
+    labels = driver.find_elements(By.XPATH, PAGE_LABEL_XPATH)
+    driver.execute_script(WATCH_RESULTS_SCRIPT, tables[-1] if tables else None, labels[-1] if labels else None)
+
+def wait_for_results(driver, timeout=20):
+    """
+    Wait until the table or its page label changed since watch_results. Unlike
+    waiting for the first row to go stale, this also works when the table was
+    empty before the search, e.g. "0 de 0", or when Angular updates the rows
+    in place
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    try:
+        WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return window.smouResultsChanged"))
+    except TimeoutException:
+        print("Timed out waiting for the table to refresh, continuing")
+
+def clear_download_dir(download_dir):
+    """Remove the files left in a session's download directory, e.g. by a run killed mid-download."""
+    for name in os.listdir(download_dir):
+        path = os.path.join(download_dir, name)
+        if os.path.isfile(path):
+            os.remove(path)
+
+def find_downloaded_pdf(download_dir, before):
+    """
+    Return the PDF downloaded since the directory was listed, or False while none is ready
+    Args:
+        download_dir (str): Directory the session downloads receipts into
+        before (set): Names of the files in it before the click, which are ignored,
+            also unfinished downloads of earlier clicks that timed out
+    Raises:
+        RuntimeError: if a download started before the click finished meanwhile,
+            so the new PDF may belong to another movement
+    """
+    listing = set(os.listdir(download_dir))
+    new_files = listing - before
+    if any(name.endswith('.crdownload') for name in new_files):
+        return False
+    pdf_files = [name for name in new_files if name.endswith('.pdf')]
+    if not pdf_files:
+        return False
+    if len(pdf_files) > 1 or any(name.endswith('.crdownload') and name not in listing for name in before):
+        for name in pdf_files:
+            os.remove(os.path.join(download_dir, name))
+        raise RuntimeError("a receipt of an earlier movement arrived during the download")
+    return os.path.join(download_dir, pdf_files[0])
+
+def download_pdf_by_click(driver, actions_button, entry_id, download_dir, timings):
+    """
+    Download a receipt through the row's actions menu
+    Args:
+        actions_button (WebElement): Button in the row's Accions cell
+        entry_id (str): Movement ID
+        download_dir (str): Directory the session downloads receipts into
+        timings (StepTimer): Step timer of the account
+    Returns:
+        tuple: PDF content, or None and the error to record
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    # Only a PDF that wasn't there before the click belongs to this movement
+    before = set(os.listdir(download_dir))
+
+    # Click the button inside the actions cell
+    driver.execute_script("arguments[0].click();", actions_button)
+
+    try:
+        # Waiting for the button to be clickable also waits for the menu to open
+        with timings.step("open actions menu"):
+            pdf_button = WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'actionText') and contains(text(), 'Descarregar PDF')]"))
+            )
+        driver.execute_script("arguments[0].click();", pdf_button)
+
+        # Wait for Chrome to finish writing the file
+        with timings.step("download PDF"):
             try:
-                # Login process
-                driver.get(smou_moviments)
+                latest_file = WebDriverWait(driver, 12, poll_frequency=0.1).until(
+                    lambda _: find_downloaded_pdf(download_dir, before)
+                )
+            except TimeoutException:
+                latest_file = None
+            except RuntimeError as e:
+                print(f"Discarded the PDF download for entry {entry_id}: {e}")
+                latest_file = None
+
+        if not latest_file:
+            print(f"PDF download failed or timed out for entry {entry_id}")
+            return None, "PDF not available"
+
+        print(f"Found downloaded PDF: {latest_file}")
+        # Keep the receipt in memory and get it off the disk straight away
+        with open(latest_file, 'rb') as f:
+            content = f.read()
+        os.remove(latest_file)
+        return content, ""
+
+    except Exception as e:
+        print(f"Error accessing PDF download button: {e}")
+        return None, "PDF download button not accessible"
+
+def build_pdf_session(driver):
+    """
+    Create a pooled HTTP session that shares the browser's login
+    Args:
+        driver (WebDriver): Logged in browser session
+    """
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=args.pdf_connections)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": driver.execute_script("return navigator.userAgent;"),
+        "Referer": driver.current_url,
+    })
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+    return session
+
+def fetch_receipt(session, entry_id):
+    """
+    Download a receipt directly from SMOU_PDF_URL
+    Returns:
+        bytes | None: PDF content, or None if the download failed
+    """
+    import requests
+
+    url = pdf_url_template.format(id=entry_id)
+    try:
+        response = session.get(url, timeout=30)
+    except requests.RequestException as e:
+        print(f"Direct PDF download failed for entry {entry_id}: {e}")
+        return None
+
+    if response.status_code != 200 or not response.content.startswith(b"%PDF"):
+        print(f"Direct PDF download failed for entry {entry_id}: HTTP {response.status_code}")
+        return None
+    return response.content
+
+def fetch_receipts(session, entry_ids):
+    """
+    Download several receipts concurrently over the pooled session
+    Returns:
+        dict: entry_id to PDF content, or None for failed downloads
+    """
+    with ThreadPoolExecutor(max_workers=args.pdf_connections) as executor:
+        return dict(zip(entry_ids, executor.map(lambda entry_id: fetch_receipt(session, entry_id), entry_ids)))
+
+def binary_version(path):
+    """Return the version number printed by `path --version`, e.g. 120.0.6099.109."""
+    output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=30).stdout
+    for word in output.split():
+        if word[:1].isdigit() and "." in word:
+            return word
+    return None
+
+def resolve_chromedriver():
+    """
+    Find a ChromeDriver matching the installed Chrome, without touching the
+    network when the local one matches. The result is remembered for the
+    process and in a manifest keyed by the binaries' modification times, so
+    later runs don't even have to ask the binaries for their versions.
+    Returns:
+        str: Path to the ChromeDriver executable
+    """
+    global resolved_driver_path
+    with driver_resolve_lock:
+        if resolved_driver_path:
+            return resolved_driver_path
+
+        local_driver = args.chromedriver
+        chrome = next(filter(None, map(shutil.which, CHROME_BINARIES)), None)
+        try:
+            with open(args.driver_manifest, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+
+        def mtime(path):
+            try:
+                return os.stat(path).st_mtime_ns
+            except (OSError, TypeError):
+                return None
+
+        if (manifest.get("driver") and manifest.get("chrome") == chrome and manifest.get("chrome_mtime") == mtime(chrome)
+                and manifest.get("driver_mtime") == mtime(manifest.get("driver"))):
+            resolved_driver_path = manifest["driver"]
+            return resolved_driver_path
+
+        chrome_version = binary_version(chrome) if chrome else None
+        driver_version = binary_version(local_driver) if os.access(local_driver, os.X_OK) else None
+        if driver_version and (chrome_version is None or driver_version.split(".")[0] == chrome_version.split(".")[0]):
+            driver_path = local_driver
+        else:
+            print(f"No local ChromeDriver matching Chrome {chrome_version}, downloading one")
+            from webdriver_manager.chrome import ChromeDriverManager
+            driver_path = ChromeDriverManager().install()
+
+        manifest = {
+            "chrome": chrome,
+            "chrome_mtime": mtime(chrome),
+            "chrome_version": chrome_version,
+            "driver": driver_path,
+            "driver_mtime": mtime(driver_path),
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(args.driver_manifest)), exist_ok=True)
+            with atomic_write(args.driver_manifest) as f:
+                json.dump(manifest, f)
+        except OSError as e:
+            print(f"Could not save the ChromeDriver manifest: {e}")
+
+        resolved_driver_path = driver_path
+        return resolved_driver_path
+
+def profile_user_agent(profile_dir):
+    """
+    Pick a user agent once per persistent profile, so a saved session is
+    always resumed by the same browser identity
+    Args:
+        profile_dir (str): Persistent user data directory
+    """
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, "user-agent.txt")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        user_agent = random.choice(user_agents)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(user_agent)
+        return user_agent
+
+def account_profile_dir(account):
+    """Return the persistent profile directory of an account, if enabled."""
+    if not args.profile_dir:
+        return None
+    digest = hashlib.sha256(account["username"].encode('utf-8')).hexdigest()[:16]
+    return os.path.join(os.path.abspath(args.profile_dir), digest)
+
+def create_driver(download_dir, profile_dir=None):
+    """
+    Start a Chrome session that downloads into its own directory
+    Args:
+        download_dir (str): Directory the session downloads receipts into
+        profile_dir (str | None): Persistent user data directory, if any
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    os.makedirs(download_dir, exist_ok=True)
+    # The directory persists between runs, a new session starts without leftovers
+    clear_download_dir(download_dir)
+    driver = webdriver.Chrome(service=Service(resolve_chromedriver()), options=build_chrome_options(download_dir, profile_dir))
+    driver.set_window_size(1920, 1080)
+    driver.command_executor._commands["send_command"] = ("POST", '/session/$sessionId/chromium/send_command')
+    driver.execute("send_command", {
+        'cmd': 'Page.setDownloadBehavior',
+        'params': {
+            'behavior': 'allow',
+            'downloadPath': download_dir
+        }
+    })
+    return driver
+
+def scrape_account(account, existing_ids, start_date, download_dir, pdf_cache, pdf_pool, drivers=None):
+    """
+    Scrape the movements of one account in its own browser session
+    Args:
+        account (dict): Account credentials
+        existing_ids (Container): IDs already stored, not modified
+        start_date (str): First day of the search range, as dd/mm/yyyy
+        download_dir (str): Directory the session downloads receipts into
+        pdf_cache (PdfParseCache): Cache of parsed receipts, shared by all accounts
+        pdf_pool (ProcessPoolExecutor): Pool parsing receipts off the browser thread
+        drivers (dict | None): Browsers kept open between runs, by account email
+    Returns:
+        list: New parking records for the account
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    print(f"\nProcessing account: {account['username']}")
+    timings = StepTimer(account['username'])
+    pdf_session = None
+    driver = drivers.get(account['username']) if drivers is not None else None
+    if driver is None:
+        with timings.step("start browser"):
+            driver = create_driver(download_dir, account_profile_dir(account))
+        if drivers is not None:
+            drivers[account['username']] = driver
+
+    try:
+        # Login process
+        with timings.step("login"):
+            driver.set_page_load_timeout(180)
+            driver.get(smou_moviments)
+            # A saved session goes straight to the movements, an expired one shows the login form
+            WebDriverWait(driver, 20).until(EC.any_of(
+                EC.presence_of_element_located((By.XPATH, "//input[@name='password']")),
+                EC.presence_of_element_located((By.ID, "mat-select-0")),
+            ))
+            if driver.find_elements(By.ID, "mat-select-0"):
+                print("Reusing saved session")
+            else:
                 email_field = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.XPATH, "//input[@placeholder=' Correu electrònic ']")))
                 email_field.send_keys(account["username"])
                 password_field = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.XPATH, "//input[@name='password']")))
                 password_field.send_keys(account["password"])
                 submit_button = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.XPATH, "//button[@type='submit' and text()='Iniciar sessió']")))
                 submit_button.click()
-                time.sleep(2)
-                driver.set_page_load_timeout(180)
+                # The login form goes away once the session is established
+                WebDriverWait(driver, 20).until(EC.invisibility_of_element_located((By.XPATH, "//input[@name='password']")))
                 driver.get(smou_moviments)
 
-                # Add after successful login
-                print("Successfully logged in")
-                print(f"Current URL: {driver.current_url}")
-
-                # Select custom range and input dates
-                mat_select = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.ID, "mat-select-0")))
-                mat_select.click()
-                rang_personalitzat_option = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//mat-option/span[contains(text(), 'Rang personalitzat')]")))
-                rang_personalitzat_option.click()
-                input_field = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, "mat-input-0")))
-                input_field.send_keys("01/05/2023")
-                today_date = datetime.today().strftime('%d/%m/%Y')
-                input_field = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, "mat-input-1")))
-                input_field.send_keys(today_date)
-                submit_button = driver.find_element(By.XPATH, "//button[@type='submit']//span[text()=' Cercar ']")
-                submit_button.click()
+        # Add after successful login
+        print("Successfully logged in")
+        print(f"Current URL: {driver.current_url}")
+
+        # Select custom range and input dates
+        with timings.step("search"):
+            mat_select = WebDriverWait(driver, 20).until(EC.element_to_be_clickable((By.ID, "mat-select-0")))
+            mat_select.click()
+            rang_personalitzat_option = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//mat-option/span[contains(text(), 'Rang personalitzat')]")))
+            rang_personalitzat_option.click()
+            input_field = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, "mat-input-0")))
+            input_field.send_keys(start_date)
+            today_date = datetime.today().strftime('%d/%m/%Y')
+            input_field = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, "mat-input-1")))
+            input_field.send_keys(today_date)
+            watch_results(driver)
+            submit_button = driver.find_element(By.XPATH, "//button[@type='submit']//span[text()=' Cercar ']")
+            submit_button.click()
+
+            # Wait for the table or the page count to show the search results
+            wait_for_results(driver)
+
+        try:
+            # Get all elements that contain 'de '
+            total_pages_elements = WebDriverWait(driver, 10).until(
+                EC.presence_of_all_elements_located((By.XPATH, PAGE_LABEL_XPATH))
+            )
+            # Select the text of the last element in the list
+            total_pages_text = total_pages_elements[-1].text if total_pages_elements else ""
+            # Extract the total number of pages
+            total_pages = int(total_pages_text.split()[-1])
+            print(f"Total pages found for account {account['username']}: {total_pages}")
+        except Exception as e:
+            print(f"Error extracting total number of pages for account {account['username']}:", e)
+            return []
+
+        # Reuse the browser's login for direct receipt downloads, if configured
+        if pdf_url_template:
+            pdf_session = build_pdf_session(driver)
+
+        # Initialize data storage for new entries from this account
+        new_entries = []
+        # Table values and pending receipt parses, in table order
+        parsed_rows = []
+        # IDs seen by this session, so duplicated rows are only downloaded once
+        seen_ids = set()
+
+        # Loop through each page and extract data
+        for page in range(total_pages):
+            print(f"Processing page {page + 1} of {total_pages} for account {account['username']}")
+
+            # Extract the text of every cell of the page in one round trip
+            table = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, TABLE_XPATH)))
+            with timings.step("read page"):
+                rows = driver.execute_script(READ_TABLE_SCRIPT, table)
+
+            # Collect the new movements of the tracked plates on this page
+            pending = {}
+            known_rows = 0
+            for row_index, cells in enumerate(rows):
+                if row_index == 0:  # Skip header
+                    continue
+                try:
+                    if len(cells) < 5:  # Assuming we need at least 5 cells for valid data
+                        continue
 
-                # Wait for the table to load
-                time.sleep(2)
+                    plate = cells[4].strip()
+                    if plate not in plate_tariffs:
+                        continue
 
+                    entry_id = cells[1].strip()
+
+                    # Skip if we already have this entry
+                    if entry_id in seen_ids or entry_id in existing_ids:
+                        known_rows += 1
+                        continue
+
+                    pending.setdefault(entry_id, (plate, cells, row_index))
+                except Exception as e:
+                    print(f"Error processing row: {e}")
+                    continue
+
+            # Fetch the receipts of the whole page at once when direct downloads are enabled
+            receipts = {}
+            if pdf_session is not None and pending:
+                with timings.step("fetch PDFs"):
+                    receipts = fetch_receipts(pdf_session, list(pending))
+
+            for entry_id, (plate, cells, row_index) in pending.items():
                 try:
-                    # Get all elements that contain 'de '
-                    total_pages_elements = WebDriverWait(driver, 10).until(
-                        EC.presence_of_all_elements_located((By.XPATH, "//span[contains(text(), 'de ')]"))
-                    )
-                    # Select the text of the last element in the list
-                    total_pages_text = total_pages_elements[-1].text if total_pages_elements else ""
-                    # Extract the total number of pages
-                    total_pages = int(total_pages_text.split()[-1])
-                    print(f"Total pages found for account {account['username']}: {total_pages}")
+                    content = receipts.get(entry_id)
+                    error = ""
+                    # Fall back to the browser when the direct download did not work,
+                    # only then is an element handle for the row's button needed
+                    if content is None:
+                        print(f"Found actions cell with text: {cells[-1]}")
+                        actions_button = driver.execute_script(ACTIONS_BUTTON_SCRIPT, table, row_index)
+                        content, error = download_pdf_by_click(driver, actions_button, entry_id, download_dir, timings)
+
+                    # Parsing happens in the process pool while the browser moves on
+                    if content is not None:
+                        pdf_result = pdf_cache.submit(content, pdf_pool)
+                    else:
+                        pdf_result = completed_future({"error": error})
+
+                    row_values = {
+                        "ID": entry_id,
+                        "Start date": cells[2].strip(),
+                        "End date": cells[3].strip(),
+                        "Number of hours and minutes": cells[9].strip(),
+                        "Type of parking": cells[7].strip(),
+                        "Cost": cells[10].strip(),
+                        "Mail": account["username"],
+                    }
+                    parsed_rows.append((row_values, plate, pdf_result))
+                    seen_ids.add(entry_id)
                 except Exception as e:
-                    print(f"Error extracting total number of pages for account {account['username']}:", e)
-                    driver.quit()
+                    print(f"Error processing row: {e}")
                     continue
 
-                # Initialize data storage for new entries from this account
-                new_entries = []
-
-                # Loop through each page and extract data
-                for page in range(total_pages):
-                    print(f"Processing page {page + 1} of {total_pages} for account {account['username']}")
-
-                    # Extract rows from the table
-                    table = WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.XPATH, "/html/body/app-root/div/div[2]/app-moviements/div/div/div[3]/div/div/div/div[1]/table")))
-                    rows = table.find_elements(By.TAG_NAME, "tr")
-
-                    # Extract data for each row
-                    for row in rows[1:]:  # Skip header
-                        try:
-                            cells = row.find_elements(By.TAG_NAME, "td")
-                            if len(cells) < 5:  # Assuming we need at least 5 cells for valid data
-                                continue
-
-                            plate = cells[4].text.strip()
-                            if plate not in plate_tariffs:
-                                continue
-
-                            entry_id = cells[1].text.strip()
-                            
-                            # Skip if we already have this entry
-                            if entry_id in existing_ids:
-                                continue
-                            
-                            try:
-                                # Get the last cell (Accions column)
-                                actions_cell = cells[-1]
-                                print(f"Found actions cell with text: {actions_cell.text}")
-                                
-                                # Click the button inside the actions cell
-                                actions_button = actions_cell.find_element(By.TAG_NAME, "button")
-                                driver.execute_script("arguments[0].click();", actions_button)
-                                time.sleep(1)  # Small wait after click
-                                
-                                # Initialize pdf_data with default error state
-                                pdf_data = {"error": "PDF not processed"}
-                                
-                                try:
-                                    pdf_button = WebDriverWait(driver, 10).until(
-                                        EC.element_to_be_clickable((By.XPATH, "//div[contains(@class, 'actionText') and contains(text(), 'Descarregar PDF')]"))
-                                    )
-                                    driver.execute_script("arguments[0].click();", pdf_button)
-                                    time.sleep(2)  # Wait for download to start
-                                    
-                                    # Wait for the file to download and check if it exists
-                                    download_dir = "/app/downloads"
-                                    timeout = time.time() + 10
-                                    pdf_downloaded = False
-                                    
-                                    while time.time() < timeout:
-                                        pdf_files = glob.glob(f"{download_dir}/*.pdf")
-                                        if pdf_files:
-                                            latest_file = max(pdf_files, key=os.path.getctime)
-                                            print(f"Found downloaded PDF: {latest_file}")
-                                            
-                                            try:
-                                                with pdfplumber.open(latest_file) as pdf:
-                                                    first_page = pdf.pages[0]
-                                                    text = first_page.extract_text()
-                                                    print("PDF content:", text.split('\n'))
-                                                    pdf_data = parse_pdf_content(text)
-                                                os.remove(latest_file)
-                                                pdf_downloaded = True
-                                                break
-                                            except Exception as e:
-                                                print(f"Error processing PDF for entry {entry_id}: {e}")
-                                                os.remove(latest_file)
-                                                pdf_data = {"error": "PDF processing failed"}
-                                    
-                                    if not pdf_downloaded:
-                                        print(f"PDF download failed or timed out for entry {entry_id}")
-                                        pdf_data = {"error": "PDF not available"}
-                                    
-                                except Exception as e:
-                                    print(f"Error accessing PDF download button: {e}")
-                                    pdf_data = {"error": "PDF download button not accessible"}
-                                
-                                # Create record with additional fields from PDF
-                                record = {
-                                    "ID": entry_id,
-                                    "Start date": cells[2].text.strip(),
-                                    "End date": cells[3].text.strip(),
-                                    "Number of hours and minutes": cells[9].text.strip(),
-                                    "Type of parking": cells[7].text.strip(),
-                                    "Cost": cells[10].text.strip(),
-                                    "Mail": account["username"],
-                                    "base_tariff": pdf_data.get('base_tariff', ''),
-                                    "applied_tariff": pdf_data.get('applied_tariff', ''),
-                                    "license_plate": pdf_data.get('license_plate', '') or plate,  # Use plate from table if not in PDF
-                                    "environmental_label": pdf_data.get('environmental_label', '') or plate_tariffs[plate],  # Use configured tariff if not in PDF
-                                    "pdf_error": pdf_data.get('error', '')
-                                }
-                                
-                                new_entries.append(record)
-                                existing_ids.add(entry_id)
-                            except Exception as e:
-                                print(f"Error processing row: {e}")
-                                continue
-
-                        except Exception as e:
-                            print(f"Error processing row: {e}")
-                            continue
-
-                    # Check if this is the last page
-                    if page >= total_pages - 1:
-                        break
-
-                    # Click the "Next" button to move to the next page
-                    next_button = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//i[contains(@class, 'fas fa-angle-right')]")))
-                    next_button.click()
-
-                    # Wait for the next page to load
-                    time.sleep(2)
-
-                # Add new entries to all_parsed_data
-                if new_entries:
-                    print(f"Found {len(new_entries)} new entries for account {account['username']}")
-                    all_parsed_data.extend(new_entries)
-                    
-                    # Save after each account's new entries
-                    with open(args.output, 'w', encoding='utf-8') as f:
-                        json.dump(all_parsed_data, f, ensure_ascii=False, indent=4)
-                    print(f"Updated data saved to {args.output}")
+            # Check if this is the last page
+            if page >= total_pages - 1:
+                break
+
+            # Movements are listed newest first, so once a page only holds
+            # movements we already have, the remaining pages are older still
+            if args.incremental and known_rows and not pending:
+                print(f"Page {page + 1} only has known entries for account {account['username']}, stopping")
+                break
+
+            # Click the "Next" button to move to the next page
+            with timings.step("next page"):
+                next_button = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.XPATH, "//i[contains(@class, 'fas fa-angle-right')]")))
+                watch_results(driver)
+                next_button.click()
+
+                # Wait for the rows of the next page, or its page label, to change
+                wait_for_results(driver)
+
+        # Finalize each record once both its row and its receipt are ready
+        with timings.step("wait for PDF parsing"):
+            for row_values, plate, pdf_result in parsed_rows:
+                try:
+                    pdf_data = pdf_result.result()
+                except Exception as e:
+                    print(f"Error processing PDF for entry {row_values['ID']}: {e}")
+                    pdf_data = {"error": "PDF not available"}
+
+                # Create record with additional fields from PDF. Values that
+                # can't be parsed are kept as displayed, without typed fields
+                record = add_derived_fields({
+                    **row_values,
+                    "base_tariff": pdf_data.get('base_tariff', ''),
+                    "applied_tariff": pdf_data.get('applied_tariff', ''),
+                    "license_plate": pdf_data.get('license_plate', '') or plate,  # Use plate from table if not in PDF
+                    "environmental_label": pdf_data.get('environmental_label', '') or plate_tariffs[plate],  # Use configured tariff if not in PDF
+                    "pdf_error": pdf_data.get('error', '')
+                })
+                if record["start_ts"] is None:
+                    print(f"Could not parse the start date of entry {row_values['ID']}: {row_values.get('Start date')!r}")
+                new_entries.append(record)
+
+        return new_entries
+    except Exception as e:
+        print(f"Error processing account {account['username']}: {str(e)}")
+        # Don't keep a browser in an unknown state for the next run
+        if drivers is not None:
+            drivers.pop(account['username'], None)
+            driver.quit()
+        return []
+    finally:
+        if drivers is None:
+            driver.quit()
+        if pdf_session is not None:
+            pdf_session.close()
+        timings.report()
+
+def newest_movements(records):
+    """Return the start of each account's newest stored movement, as local time."""
+    newest = {}
+    for record in records:
+        if record["start_ts"] is None:
+            continue
+        if record["Mail"] not in newest or record["start_ts"] > newest[record["Mail"]]:
+            newest[record["Mail"]] = record["start_ts"]
+    return {mail: datetime.fromtimestamp(start, SMOU_TIMEZONE).replace(tzinfo=None) for mail, start in newest.items()}
+
+def search_start_dates(newest):
+    """
+    Start each account's search shortly before its newest stored movement
+    Args:
+        newest (dict): Account email to the local start time of its newest movement
+    Returns:
+        dict: Account email to search start date, as dd/mm/yyyy
+    """
+    full_scan_start = datetime.strptime(FULL_SCAN_START_DATE, '%d/%m/%Y')
+    return {
+        mail: max(start - timedelta(days=args.overlap_days), full_scan_start).strftime('%d/%m/%Y')
+        for mail, start in newest.items()
+    }
+
+def merge_new_entries(entries, existing_ids):
+    """
+    Keep the entries that aren't stored yet, once each
+    Args:
+        entries (list): Scraped parking records
+        existing_ids (set): IDs already stored, updated with the new ones
+    Returns:
+        list: The new records, in scraping order
+    """
+    new_entries = []
+    for entry in entries:
+        if entry["ID"] not in existing_ids:
+            existing_ids.add(entry["ID"])
+            new_entries.append(entry)
+    return new_entries
+
+def collect_parking_data(selected=None, drivers=None, pdf_pool=None):
+    """
+    Scrape the accounts and save their new movements
+    Args:
+        selected (list | None): Indexes of the accounts to scrape, all by default
+        drivers (dict | None): Browsers to keep open between runs, by account email
+        pdf_pool (ProcessPoolExecutor | None): Receipt parser pool to reuse
+    """
+    # Loads multiprocessing, only pay for it when actually scraping
+    from concurrent.futures import ProcessPoolExecutor
+
+    if selected is None:
+        selected = range(len(accounts))
+
+    try:
+        connection = None
+        all_parsed_data = None
+        if args.sqlite:
+            # The database is the source of truth, the output file only an export
+            connection = open_sqlite_store(args.sqlite)
+            changed = export_stale = prepare_sqlite_store(connection, args.output)
+            existing_ids = SqliteIdLookup(args.sqlite)
+            newest = sqlite_newest_movements(connection)
+        else:
+            # Try to load existing data first
+            try:
+                all_parsed_data = load_parking_data(args.output)
+                print(f"Loaded {len(all_parsed_data)} existing entries")
+            except FileNotFoundError:
+                all_parsed_data = []
+                print("No existing data found, starting fresh collection")
+            existing_ids = {entry["ID"] for entry in all_parsed_data}
+
+            # Files written before the derived fields existed are upgraded once
+            upgraded = backfill_derived_fields(all_parsed_data)
+            if upgraded:
+                if is_ndjson(args.output):
+                    rewrite_ndjson(args.output, all_parsed_data)
                 else:
-                    print(f"No new entries found for account {account['username']}")
+                    save_parking_data(args.output, all_parsed_data)
+                print(f"Added derived fields to {len(upgraded)} stored entries")
+            changed = bool(upgraded)
+            export_stale = False
+            newest = newest_movements(all_parsed_data)
+
+        pdf_cache = PdfParseCache(args.pdf_cache or os.path.join(os.path.dirname(os.path.abspath(args.output)), "pdf_cache.json"))
+        start_dates = search_start_dates(newest) if args.incremental else {}
 
+        def scrape(index):
+            account = accounts[index]
+            start_date = start_dates.get(account["username"], FULL_SCAN_START_DATE)
+            try:
+                return scrape_account(account, existing_ids, start_date, os.path.join(args.download_dir, f"account{index + 1}"), pdf_cache, pdf_pool, drivers)
             except Exception as e:
-                print(f"Error processing account {account['username']}: {str(e)}")
-            finally:
-                driver.quit()
+                # e.g. a browser that doesn't start, the other accounts' movements are still saved
+                print(f"Error processing account {account['username']}: {e}")
+                return []
+
+        # Scrape accounts in parallel, each in its own browser session, and
+        # merge the results here so only this thread deduplicates and writes
+        try:
+            with ExitStack() as stack:
+                if pdf_pool is None:
+                    pdf_pool = stack.enter_context(ProcessPoolExecutor(max_workers=args.pdf_processes))
+                    # Start the parser processes now, before any browser thread exists
+                    pdf_pool.submit(int).result()
+                executor = stack.enter_context(ThreadPoolExecutor(max_workers=max(1, args.workers)))
+
+                results = executor.map(scrape, selected)
+                for account, account_entries in zip((accounts[index] for index in selected), results):
+                    if connection is not None:
+                        new_entries = sqlite_insert_new(connection, account_entries)
+                    else:
+                        new_entries = merge_new_entries(account_entries, existing_ids)
+
+                    if not new_entries:
+                        print(f"No new entries found for account {account['username']}")
+                        continue
 
-        print(f"\nCollection completed. Total entries: {len(all_parsed_data)}")
+                    print(f"Found {len(new_entries)} new entries for account {account['username']}")
+                    changed = True
+                    if connection is not None:
+                        print(f"Updated data saved to {args.sqlite}")
+                    else:
+                        all_parsed_data.extend(new_entries)
+
+                    # Save after each account's new entries, the JSON array only once per run
+                    if is_ndjson(args.output) and not export_stale:
+                        append_parking_data(args.output, new_entries)
+                        print(f"Updated data saved to {args.output}")
+                    else:
+                        export_stale = True
+        finally:
+            # Whatever happened to the accounts, keep what was found so far
+            pdf_cache.save()
+
+            if export_stale:
+                if connection is not None:
+                    all_parsed_data = sqlite_load(connection)
+                if is_ndjson(args.output):
+                    rewrite_ndjson(args.output, all_parsed_data)
+                else:
+                    save_parking_data(args.output, all_parsed_data)
+                print(f"Updated data saved to {args.output}")
+
+            if connection is not None:
+                (total_entries,) = connection.execute("SELECT COUNT(*) FROM movements").fetchone()
+                existing_ids.close()
+                connection.close()
+            else:
+                total_entries = len(all_parsed_data)
+
+            # Only wake the integration up when the stored data actually changed
+            if changed:
+                notify_home_assistant()
+
+        print(f"\nCollection completed. Total entries: {total_entries}")
 
     except Exception as e:
         print(f"Error collecting data: {e}")
 
+def parse_pdf_bytes(content: bytes) -> dict:
+    """Parse a receipt held in memory."""
+    import pdfplumber
+
+    # Every field we need is on the first page, don't load the others
+    with pdfplumber.open(io.BytesIO(content), pages=[1]) as pdf:
+        text = pdf.pages[0].extract_text()
+        print("PDF content:", text.split('\n'))
+        return parse_pdf_content(text)
+
+def completed_future(result):
+    """Wrap an already known result in a Future."""
+    future = Future()
+    future.set_result(result)
+    return future
+
+class PdfParseCache:
+    """Parsed receipt fields keyed by the SHA-256 of the PDF bytes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+
+    def submit(self, content: bytes, executor) -> Future:
+        """
+        Parse a receipt in the executor, unless identical bytes were parsed before
+        Returns:
+            Future: Resolves to the parsed fields
+        """
+        key = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached is not None:
+            return completed_future(dict(cached))
+
+        future = executor.submit(parse_pdf_bytes, content)
+        future.add_done_callback(lambda done: self._store(key, done))
+        return future
+
+    def _store(self, key, future):
+        """Remember the result of a successful parse."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self._lock:
+            self._entries[key] = future.result()
+            self._dirty = True
+
+    def save(self):
+        """Write the cache if new receipts were parsed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            with atomic_write(self.path) as f:
+                json.dump(self._entries, f, ensure_ascii=False, separators=(',', ':'))
+            self._dirty = False
+
 def parse_pdf_content(text: str) -> dict:
     """Parse PDF content and extract relevant fields."""
     lines = text.split('\n')
@@ -391,5 +1425,116 @@ def parse_pdf_content(text: str) -> dict:
             
     return parsed_data
 
+def next_run_delay():
+    """Return the time until an account's next scheduled run, with jitter."""
+    return max(60, args.interval + random.uniform(-args.jitter, args.jitter))
+
+def start_trigger_servers(refresh):
+    """
+    Listen for refresh requests on the configured HTTP port and Unix socket
+    Args:
+        refresh (threading.Event): Set whenever a refresh is requested
+    Returns:
+        list: The running servers
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import socketserver
+
+    servers = []
+
+    if args.trigger_port:
+        class RefreshHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.rstrip('/') != '/refresh':
+                    self.send_error(404)
+                    return
+                refresh.set()
+                self.send_response(202)
+                self.end_headers()
+
+            def log_message(self, format, *log_args):
+                print(f"Trigger request: {format % log_args}")
+
+        servers.append(ThreadingHTTPServer((args.trigger_host, args.trigger_port), RefreshHandler))
+        print(f"Listening for refresh requests on http://{args.trigger_host}:{args.trigger_port}/refresh")
+
+    if args.trigger_socket:
+        class SocketRefreshHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                refresh.set()
+                self.wfile.write(b"ok\n")
+
+        if os.path.exists(args.trigger_socket):
+            os.remove(args.trigger_socket)
+        servers.append(socketserver.UnixStreamServer(args.trigger_socket, SocketRefreshHandler))
+        print(f"Listening for refresh requests on {args.trigger_socket}")
+
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return servers
+
+def run_daemon():
+    """
+    Keep scraping on an internal schedule, with warm browsers and parser
+    processes, instead of starting from scratch on every cron run
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    # SIGTERM from `docker stop` cleans up like Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    drivers = {}
+    refresh = threading.Event()
+    # Every account runs once at startup, then on its own jittered schedule
+    next_runs = {index: time.monotonic() for index in range(len(accounts))}
+
+    with ProcessPoolExecutor(max_workers=args.pdf_processes) as pdf_pool:
+        # Start the parser processes before any other thread exists
+        pdf_pool.submit(int).result()
+        servers = start_trigger_servers(refresh)
+        try:
+            while True:
+                now = time.monotonic()
+                due = [index for index, next_run in next_runs.items() if next_run <= now]
+                if due:
+                    collect_parking_data(due, drivers, pdf_pool)
+                    for index in due:
+                        next_runs[index] = time.monotonic() + next_run_delay()
+                    continue
+
+                if refresh.wait(min(next_runs.values()) - now):
+                    refresh.clear()
+                    print("Refresh requested, scraping all accounts")
+                    next_runs = dict.fromkeys(next_runs, 0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for server in servers:
+                server.shutdown()
+            for driver in drivers.values():
+                driver.quit()
+
+def main(argv=None):
+    """
+    Run the scraper from the command line
+    Args:
+        argv (list | None): Command line arguments, sys.argv by default
+    """
+    global args
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+
+    if args.migrate_from:
+        if not is_ndjson(args.output):
+            parser.error("--migrate-from requires an --output ending in .jsonl or .ndjson")
+        migrate_to_ndjson(args.migrate_from, args.output)
+        return
+
+    load_config()
+    if args.daemon:
+        run_daemon()
+    else:
+        collect_parking_data()
+
 if __name__ == "__main__":
-    collect_parking_data()
+    main()